@@ -1,4 +1,5 @@
 import os
+import sys
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
@@ -11,6 +12,35 @@ from app.extensions import db, migrate
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# flask CLI options that take a value (so the value isn't mistaken for the command)
+_CLI_VALUE_OPTIONS = {"--app", "-A", "--env-file", "-e"}
+
+
+def _running_db_command():
+    """True when the app is being loaded for a `flask db ...` command."""
+    import click
+    if click.get_current_context(silent=True) is None:
+        return False
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg in _CLI_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg == "db"
+    return False
+
+
+def _schema_managed_by_migrations():
+    """True when Alembic owns the schema: a `db` command is running or the
+    database has been stamped with a revision."""
+    if _running_db_command():
+        return True
+    from sqlalchemy import inspect, text
+    if not inspect(db.engine).has_table("alembic_version"):
+        return False
+    with db.engine.connect() as conn:
+        return conn.execute(text("SELECT 1 FROM alembic_version LIMIT 1")).first() is not None
+
 def create_app():
     app = Flask(__name__, template_folder="templates")
 
@@ -39,6 +69,31 @@ def create_app():
         app.config["MATCH_COMPLETENESS_THRESHOLD"] = int(os.environ.get("MATCH_COMPLETENESS_THRESHOLD", 70))
     except Exception:
         app.config["MATCH_COMPLETENESS_THRESHOLD"] = 70
+    try:
+        app.config["MATCH_BATCH_MEMORY_MB"] = int(os.environ.get("MATCH_BATCH_MEMORY_MB", 64))
+    except Exception:
+        app.config["MATCH_BATCH_MEMORY_MB"] = 64
+    try:
+        app.config["MATCH_WORKERS"] = int(os.environ.get("MATCH_WORKERS", 1))
+        app.config["MATCH_CHUNK_SIZE"] = int(os.environ.get("MATCH_CHUNK_SIZE", 0))
+    except Exception:
+        app.config["MATCH_WORKERS"] = 1
+        app.config["MATCH_CHUNK_SIZE"] = 0
+    try:
+        app.config["MATCH_JOB_CHUNK_SIZE"] = int(os.environ.get("MATCH_JOB_CHUNK_SIZE", 500))
+        app.config["MATCH_JOB_STALE_SECONDS"] = int(os.environ.get("MATCH_JOB_STALE_SECONDS", 120))
+    except Exception:
+        app.config["MATCH_JOB_CHUNK_SIZE"] = 500
+        app.config["MATCH_JOB_STALE_SECONDS"] = 120
+    try:
+        app.config["MATCH_KEEP_PER_STUDENT"] = int(os.environ.get("MATCH_KEEP_PER_STUDENT", 0))
+    except Exception:
+        app.config["MATCH_KEEP_PER_STUDENT"] = 0
+    try:
+        app.config["MATCH_SCORE_CACHE_MB"] = float(os.environ.get("MATCH_SCORE_CACHE_MB", 16))
+    except Exception:
+        app.config["MATCH_SCORE_CACHE_MB"] = 16
+    app.config["MATCH_JOB_THREAD"] = os.environ.get("MATCH_JOB_THREAD", "1") not in ("0", "false", "False")
 
     # init extensions
     db.init_app(app)
@@ -58,10 +113,19 @@ def create_app():
     app.register_blueprint(routes_mod.bp)
     app.register_blueprint(oauth_routes_mod.oauth_bp)
 
-    # Create tables automatically (development convenience)
+    # flask CLI commands (match-worker, ...)
+    from app.cli import register_commands
+    register_commands(app)
+
+    # Create tables automatically (development convenience). Skipped once
+    # migrations own the schema, otherwise create_all() would pre-create the
+    # tables that `flask db upgrade` is about to add (and backfill).
     with app.app_context():
         try:
-            db.create_all()
+            if _schema_managed_by_migrations():
+                app.logger.info("Schema is managed by migrations; skipping db.create_all()")
+            else:
+                db.create_all()
         except Exception as e:
             app.logger.warning(f"db.create_all() failed: {e}")
 
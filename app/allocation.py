@@ -0,0 +1,199 @@
+"""Capacity- and quota-aware allocation of students to internships.
+
+Student-proposing deferred acceptance over the sparse score graph: each
+student proposes to internships in descending score order, and each
+internship holds the best proposals it can seat and rejects the rest, until
+nobody has anyone left to propose to. Everything here is database-free and
+deterministic, so the same graph always gives the same assignment.
+
+Seats are filled the way reservations usually work: open seats first, on
+score alone; then each reserved category's seats from the remaining eligible
+candidates; then reserved seats that found no eligible candidate revert to
+open (de-reservation).
+"""
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import Counter, defaultdict, namedtuple
+
+import numpy as np
+
+QUOTA_CATEGORIES = ("sc", "st", "obc", "rural")
+RURAL_DISTRICTS = ("rural", "aspirational")
+
+Allocation = namedtuple("Allocation", "student_ids internship_ids scores seats stats")
+
+
+def student_categories(social_category, district_type):
+    """Quota categories a student is eligible for"""
+    categories = set()
+    if social_category and social_category.strip().lower() in QUOTA_CATEGORIES:
+        categories.add(social_category.strip().lower())
+    if district_type and district_type.strip().lower() in RURAL_DISTRICTS:
+        categories.add("rural")
+    return categories
+
+
+def reserved_seats(capacity, quotas):
+    """Per-category reserved seats, trimmed in QUOTA_CATEGORIES order so they never exceed capacity"""
+    seats = {}
+    left = capacity
+    for category in QUOTA_CATEGORIES:
+        seats[category] = min(max(quotas.get(category) or 0, 0), left)
+        left -= seats[category]
+    return seats
+
+
+def _choose(candidates, capacity, reserved, eligible):
+    """Split ``candidates`` (sorted best first) into seated (candidate, seat) pairs and rejects"""
+    open_seats = capacity - sum(reserved.values())
+    seated = [(c, "open") for c in candidates[:open_seats]]
+    rest = candidates[open_seats:]
+
+    for category in QUOTA_CATEGORIES:
+        seats = reserved[category]
+        if not seats or not rest:
+            continue
+        still = []
+        for c in rest:
+            if seats and category in eligible[c[2]]:
+                seated.append((c, category))
+                seats -= 1
+            else:
+                still.append(c)
+        rest = still
+
+    spare = capacity - len(seated)
+    seated.extend((c, "dereserved") for c in rest[:spare])
+    return seated, rest[spare:]
+
+
+def deferred_acceptance(student_ids, internship_ids, edge_students, edge_internships, edge_scores,
+                        capacity, quotas, eligible):
+    """Assign students to internships.
+
+    ``edge_*`` are parallel arrays of positions into ``student_ids`` and
+    ``internship_ids`` with the pair's score. ``capacity`` is the free seats
+    per internship, ``quotas`` maps category to a per-internship array and
+    ``eligible`` is each student's set of quota categories. Students rank
+    internships by score, then internship id; internships rank students by
+    score, then student id.
+    """
+    started = time.perf_counter()
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    internship_ids = np.asarray(internship_ids, dtype=np.int64)
+
+    order = np.lexsort((internship_ids[edge_internships], -edge_scores, edge_students))
+    pref_internship = edge_internships[order]
+    pref_score = edge_scores[order]
+    degree = np.bincount(edge_students, minlength=len(student_ids))
+    start = np.r_[0, np.cumsum(degree)[:-1]]
+    next_choice = np.zeros(len(student_ids), dtype=np.int64)
+
+    reserved = [
+        reserved_seats(int(capacity[i]), {c: int(quotas[c][i]) for c in QUOTA_CATEGORIES})
+        for i in range(len(internship_ids))
+    ]
+    held = defaultdict(list)
+    seat_of = {}
+
+    free = np.flatnonzero(degree > 0).tolist()
+    rounds = proposals = 0
+    while free:
+        rounds += 1
+        incoming = defaultdict(list)
+        for s in free:
+            k = start[s] + next_choice[s]
+            next_choice[s] += 1
+            i = int(pref_internship[k])
+            incoming[i].append((-float(pref_score[k]), int(student_ids[s]), s))
+        proposals += len(free)
+
+        free = []
+        for i, new in incoming.items():
+            if capacity[i] <= 0:
+                rejected = new
+            else:
+                candidates = sorted(held[i] + new)
+                seated, rejected = _choose(candidates, int(capacity[i]), reserved[i], eligible)
+                held[i] = [c for c, _ in seated]
+                for c, seat in seated:
+                    seat_of[c[2]] = (i, seat, -c[0])
+            for c in rejected:
+                # a rejected student was either proposing here or held here until now
+                seat_of.pop(c[2], None)
+                if next_choice[c[2]] < degree[c[2]]:
+                    free.append(c[2])
+        free.sort()
+
+    assigned = sorted(seat_of)
+    seats = [seat_of[s][1] for s in assigned]
+    result = Allocation(
+        student_ids=student_ids[assigned],
+        internship_ids=internship_ids[[seat_of[s][0] for s in assigned]] if assigned else np.empty(0, dtype=np.int64),
+        scores=np.array([seat_of[s][2] for s in assigned], dtype=np.float64),
+        seats=seats,
+        stats=None,
+    )
+
+    stats = Counter(seats)
+    stats.update(
+        students=len(student_ids),
+        students_with_edges=int((degree > 0).sum()),
+        internships=len(internship_ids),
+        edges=len(edge_scores),
+        seats_available=int(np.maximum(capacity, 0).sum()),
+        assigned=len(assigned),
+        rounds=rounds,
+        proposals=proposals,
+    )
+    stats = dict(stats)
+    stats["total_score"] = round(float(result.scores.sum()), 6)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    return result._replace(stats=stats)
+
+
+def assignment_digest(allocation):
+    """Stable fingerprint of an assignment, for checking that two runs agree"""
+    h = hashlib.sha256()
+    for sid, iid, seat in zip(allocation.student_ids.tolist(), allocation.internship_ids.tolist(), allocation.seats):
+        h.update(f"{sid}:{iid}:{seat}\n".encode())
+    return h.hexdigest()
+
+
+def graph_digest(student_ids, internship_ids, edge_students, edge_internships, edge_scores):
+    """Stable fingerprint of the input graph, independent of edge order"""
+    sids = np.asarray(student_ids, dtype=np.int64)[edge_students]
+    iids = np.asarray(internship_ids, dtype=np.int64)[edge_internships]
+    order = np.lexsort((iids, sids))
+    h = hashlib.sha256()
+    h.update(sids[order].tobytes())
+    h.update(iids[order].tobytes())
+    h.update(np.round(np.asarray(edge_scores, dtype=np.float64)[order], 12).tobytes())
+    return h.hexdigest()
+
+
+def write_report(allocation, directory, meta=None):
+    """Write ``assignments.csv`` and ``summary.json`` to ``directory``; returns their paths.
+
+    Rows are ordered by student id and the summary carries digests of the
+    input graph and the assignment, so two runs can be compared directly.
+    """
+    os.makedirs(directory, exist_ok=True)
+    csv_path = os.path.join(directory, "assignments.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student_id", "internship_id", "score", "seat"])
+        for sid, iid, score, seat in zip(allocation.student_ids.tolist(), allocation.internship_ids.tolist(),
+                                         allocation.scores.tolist(), allocation.seats):
+            writer.writerow([sid, iid, f"{score:.6f}", seat])
+
+    summary = dict(meta or {})
+    summary["assignment_digest"] = assignment_digest(allocation)
+    summary["stats"] = allocation.stats
+    json_path = os.path.join(directory, "summary.json")
+    with open(json_path, "w") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    return csv_path, json_path
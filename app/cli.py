@@ -0,0 +1,181 @@
+import json
+
+import click
+
+from app import jobs
+from app.allocation import write_report
+from app.evaluation import DEFAULT_KS, SCOPES, evaluate, synthetic_dataset
+from app.matching_engine import matching_engine
+from app.models import WeightProfile
+from app.scoring import WEIGHTS
+
+
+def find_profile(label):
+    """Weight profile for NAME@vN or the latest version of NAME; None for "default"."""
+    if label == "default":
+        return None
+    name, _, version = label.partition("@v")
+    query = WeightProfile.query.filter_by(name=name)
+    query = query.filter_by(version=int(version)) if version.isdigit() else query
+    profile = query.order_by(WeightProfile.version.desc()).first()
+    if profile is None:
+        raise click.UsageError(f"No weight profile {label!r}")
+    return profile
+
+
+def register_commands(app):
+    @app.cli.command("match-worker")
+    @click.option("--once", is_flag=True, help="Run pending jobs and exit instead of polling.")
+    @click.option("--poll", default=5, show_default=True, help="Seconds between polls when idle.")
+    def match_worker(once, poll):
+        """Run queued match jobs."""
+        if once:
+            click.echo(f"Ran {jobs.run_pending_jobs()} job(s)")
+        else:
+            jobs.work_forever(poll)
+
+    @app.cli.command("backfill-application-scores")
+    @click.option("--all", "rescore_all", is_flag=True, help="Rescore applications that already have a score.")
+    @click.option("--batch-size", default=500, show_default=True, help="Applications scored per commit.")
+    def backfill_application_scores(rescore_all, batch_size):
+        """Store match scores on existing applications."""
+        count = matching_engine.backfill_application_scores(batch_size=batch_size, rescore_all=rescore_all)
+        click.echo(f"Scored {count} application(s)")
+
+    @app.cli.command("backfill-completeness")
+    @click.option("--batch-size", default=500, show_default=True, help="Students updated per commit.")
+    def backfill_completeness(batch_size):
+        """Store profile completeness on students created before it was tracked."""
+        count = matching_engine.backfill_profile_completeness(batch_size=batch_size)
+        click.echo(f"Updated {count} student(s)")
+
+    @app.cli.command("normalize-ids")
+    @click.option("--batch-size", default=500, show_default=True, help="Rows resolved per commit.")
+    def normalize_ids(batch_size):
+        """Resolve stored locations, sectors and skills against the gazetteer, taxonomy and skill vocabulary."""
+        changed = matching_engine.normalize_reference_ids(batch_size=batch_size)
+        click.echo(f"Updated {changed['students']} student(s) and {changed['internships']} internship(s)")
+        click.echo(f"Relinked skills of {changed['students_skills']} student(s) "
+                   f"and {changed['internships_skills']} internship(s)")
+
+    @app.cli.command("compact-matches")
+    @click.option("--keep", type=int, default=None, help="Matches kept per student (default MATCH_KEEP_PER_STUDENT).")
+    @click.option("--batch-size", default=500, show_default=True, help="Students trimmed per commit.")
+    def compact_matches(keep, batch_size):
+        """Trim stored matches to each student's best K."""
+        keep = keep if keep is not None else app.config.get("MATCH_KEEP_PER_STUDENT", 0)
+        if not keep:
+            raise click.UsageError("Set --keep or MATCH_KEEP_PER_STUDENT to a positive number.")
+        removed = matching_engine.compact_matches(keep=keep, batch_size=batch_size)
+        click.echo(f"Removed {removed} match(es)")
+
+    @app.cli.command("sweep-matches")
+    @click.option("--batch-size", default=500, show_default=True, help="Matches (or students, when rescoring) per commit.")
+    @click.option("--no-rescore", is_flag=True, help="Delete matches from an older engine version instead of rescoring them.")
+    def sweep_matches(batch_size, no_rescore):
+        """Delete or rescore stale pending matches."""
+        stats = matching_engine.sweep_stale_matches(batch_size=batch_size, rescore=not no_rescore)
+        for key, value in sorted(stats.items()):
+            click.echo(f"{key}: {value}")
+
+    @app.cli.command("allocate")
+    @click.option("--source", type=click.Choice(["matches", "scores"]), default="matches", show_default=True,
+                  help="Use stored matches, or rescore every student, as the score graph.")
+    @click.option("--keep", type=int, default=None, help="With --source scores, edges kept per student.")
+    @click.option("--output", default="allocation_report", show_default=True, help="Directory for the report.")
+    def allocate(source, keep, output):
+        """Assign students to internships within capacity and quotas."""
+        allocation, meta = matching_engine.allocate(source=source, keep=keep)
+        csv_path, json_path = write_report(allocation, output, meta)
+        for key, value in sorted(allocation.stats.items()):
+            click.echo(f"{key}: {value}")
+        click.echo(f"Wrote {csv_path} and {json_path}")
+
+    @app.cli.group("weights")
+    def weights():
+        """Manage named, versioned scoring weight profiles."""
+
+    @weights.command("list")
+    def list_profiles():
+        """Show every weight profile, newest version first."""
+        profiles = WeightProfile.query.order_by(WeightProfile.name, WeightProfile.version.desc()).all()
+        active = next((p for p in profiles if p.is_active), None)
+        click.echo(f"{'*' if active is None else ' '} default (built-in): {json.dumps(WEIGHTS)}")
+        for profile in profiles:
+            click.echo(f"{'*' if profile.is_active else ' '} {profile.label}: {json.dumps(profile.weights)}")
+
+    @weights.command("create")
+    @click.argument("name")
+    @click.option("--set", "values", multiple=True, metavar="COMPONENT=WEIGHT",
+                  help="Override one component of the active weights; repeatable.")
+    @click.option("--activate", is_flag=True, help="Make the new profile active.")
+    def create_profile(name, values, activate):
+        """Save the active weights with overrides as the next version of NAME."""
+        weights = dict(matching_engine.weights)
+        for value in values:
+            component, _, weight = value.partition("=")
+            try:
+                weights[component.strip()] = float(weight)
+            except ValueError:
+                raise click.BadParameter(f"{value!r} is not COMPONENT=WEIGHT", param_hint="--set")
+        try:
+            profile = matching_engine.create_weight_profile(name, weights, activate=activate)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.echo(f"Created {profile.label}{' (active)' if activate else ''}")
+
+    @weights.command("activate")
+    @click.argument("label")
+    @click.option("--rerank", is_flag=True, help="Re-rank stored matches and applications with the profile.")
+    def activate_profile(label, rerank):
+        """Activate NAME@vN (latest version of NAME without a suffix), or "default"."""
+        profile = find_profile(label)
+        matching_engine.activate_weight_profile(profile)
+        click.echo(f"Activated {profile.label if profile else 'default'}")
+        if rerank:
+            for key, value in sorted(matching_engine.rerank_matches().items()):
+                click.echo(f"{key}: {value}")
+
+    @app.cli.command("evaluate-ranking")
+    @click.option("--profile", "labels", multiple=True,
+                  help='Weight profile (NAME[@vN] or "default") to evaluate; repeatable. Defaults to the active one.')
+    @click.option("-k", "ks", type=int, multiple=True, help=f"Cut-offs for precision@k and NDCG@k (default {DEFAULT_KS}).")
+    @click.option("--scope", type=click.Choice(SCOPES), default="applied", show_default=True,
+                  help="Rank only each student's labelled applications, or the whole catalog.")
+    @click.option("--synthetic", is_flag=True, help="Evaluate on a generated dataset instead of the database.")
+    @click.option("--students", default=2000, show_default=True, help="With --synthetic, number of students.")
+    @click.option("--internships", default=500, show_default=True, help="With --synthetic, number of internships.")
+    @click.option("--seed", default=0, show_default=True, help="With --synthetic, random seed.")
+    @click.option("--chunk-size", default=256, show_default=True, help="Students scored per block.")
+    @click.option("--output", default=None, help="Also write the results to this JSON file.")
+    def evaluate_ranking(labels, ks, scope, synthetic, students, internships, seed, chunk_size, output):
+        """Replay the ranking against historical application outcomes.
+
+        Point DATABASE_URL at a snapshot to evaluate one without touching the
+        live database.
+        """
+        if synthetic:
+            dataset = synthetic_dataset(n_students=students, n_internships=internships, seed=seed)
+        else:
+            dataset = matching_engine.evaluation_dataset()
+            if not dataset[2]:
+                raise click.UsageError("No accepted, shortlisted or rejected applications to evaluate against.")
+
+        if labels:
+            profiles = {label: find_profile(label) for label in labels}
+            profiles = {label: p.weights if p else WEIGHTS for label, p in profiles.items()}
+        else:
+            profiles = {"active": matching_engine.weights}
+
+        results = {}
+        for label, weights in profiles.items():
+            results[label] = evaluate(*dataset, weights=weights, ks=ks or DEFAULT_KS, scope=scope,
+                                      chunk_size=chunk_size)
+            click.echo(f"[{label}]")
+            for key, value in results[label].items():
+                click.echo(f"  {key}: {value}")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            click.echo(f"Wrote {output}")
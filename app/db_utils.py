@@ -0,0 +1,57 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+
+
+def insert_ignore(model, rows):
+    """Bulk insert ``rows``, skipping any that hit a unique constraint.
+
+    Emits ``INSERT ... ON CONFLICT DO NOTHING`` on PostgreSQL and SQLite and
+    ``INSERT IGNORE`` on MySQL, as a single executemany round trip.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table).on_conflict_do_nothing()
+    elif dialect in ("mysql", "mariadb"):
+        stmt = insert(table).prefix_with("IGNORE")
+    else:
+        stmt = insert(table)
+
+    db.session.execute(stmt, rows)
+
+
+def upsert(model, rows, index_elements, update_columns):
+    """Bulk insert ``rows``, overwriting ``update_columns`` where ``index_elements`` already exist.
+
+    Uses ``INSERT ... ON CONFLICT DO UPDATE`` on PostgreSQL and SQLite; other
+    databases fall back to looking each row up by ``index_elements``.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        existing = model.query.filter_by(**{k: row[k] for k in index_elements}).first()
+        if existing is None:
+            db.session.add(model(**row))
+        else:
+            for c in update_columns:
+                setattr(existing, c, row[c])
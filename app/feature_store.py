@@ -0,0 +1,377 @@
+import copy
+from datetime import datetime
+
+import numpy as np
+
+from app.gazetteer import get_gazetteer
+from app.sectors import UNKNOWN_SECTOR, get_taxonomy
+from app.skills_model import parse_skills, student_skills_text
+
+
+QUOTA_COLUMNS = ("rural", "sc", "st", "obc")
+
+# the Student columns the scorers read
+STUDENT_FIELDS = (
+    "id", "technical_skills", "soft_skills", "sector_interests", "sector_interest_ids",
+    "preferred_locations", "current_location", "preferred_location_ids", "current_location_id",
+    "course", "year_of_study", "cgpa",
+    "social_category", "district_type", "previous_internships", "pm_scheme_participant",
+)
+
+
+class StudentRecord:
+    """Plain, picklable copy of the student fields used for scoring"""
+
+    __slots__ = STUDENT_FIELDS
+
+    def __init__(self, **values):
+        for field in STUDENT_FIELDS:
+            setattr(self, field, values.get(field))
+
+    @classmethod
+    def from_student(cls, student):
+        return cls(**{field: getattr(student, field) for field in STUDENT_FIELDS})
+
+
+# the Internship columns the scorers and the skills model read
+INTERNSHIP_FIELDS = (
+    "id", "required_skills", "sector", "sector_id", "location", "location_id", "is_remote",
+    "preferred_course", "year_of_study_requirement",
+    "min_cgpa", "stipend", "total_positions", "filled_positions", "application_deadline",
+    "rural_quota", "sc_quota", "st_quota", "obc_quota",
+)
+
+
+class InternshipRecord:
+    """Plain, picklable copy of the internship fields used for scoring"""
+
+    __slots__ = INTERNSHIP_FIELDS
+
+    def __init__(self, **values):
+        for field in INTERNSHIP_FIELDS:
+            setattr(self, field, values.get(field))
+
+
+def _factorize(values):
+    """Map lowercased strings to dense ids; missing/empty values get -1"""
+    uniques = {}
+    ids = np.full(len(values), -1, dtype=np.int64)
+    for n, value in enumerate(values):
+        if value:
+            ids[n] = uniques.setdefault(value.lower(), len(uniques))
+    return ids, np.array(list(uniques), dtype=str)
+
+
+def _contains(haystacks, needle):
+    """Vectorized ``needle in haystack`` over an array of strings"""
+    if not len(haystacks):
+        return np.zeros(0, dtype=bool)
+    return np.char.find(haystacks, needle) >= 0
+
+
+def _gather(table, ids, missing):
+    """Look up per-unique-value scores, using ``missing`` where the id is -1"""
+    table = np.append(table, missing)
+    return table[ids]
+
+
+class InternshipFeatureStore:
+    """Columnar view of the active internships used by the vectorized scorers.
+
+    Every array is aligned with ``internship_ids``. String columns are stored as
+    ids into small arrays of unique lowercased values, so string work per
+    student is proportional to the number of distinct values, not internships.
+    """
+
+    def __init__(self, internships):
+        self.internship_ids = np.array([i.id for i in internships], dtype=np.int64)
+        self.col_of = {iid: col for col, iid in enumerate(self.internship_ids.tolist())}
+
+        self.min_cgpa = np.array([i.min_cgpa or 0.0 for i in internships], dtype=np.float64)
+        self.filled_positions = np.array([i.filled_positions or 0 for i in internships], dtype=np.int64)
+        self.total_positions = np.array([i.total_positions or 0 for i in internships], dtype=np.int64)
+        self.stipend = np.array([i.stipend or 0.0 for i in internships], dtype=np.float64)
+        self.deadline = np.array([i.application_deadline for i in internships], dtype="datetime64[us]").reshape(-1)
+        self.quotas = {
+            name: np.array([getattr(i, f"{name}_quota") or 0 for i in internships], dtype=np.int64)
+            for name in QUOTA_COLUMNS
+        }
+
+        # location text is kept for substring filters; scoring uses gazetteer positions
+        self.location_ids, self.locations = _factorize([i.location for i in internships])
+        gazetteer = get_gazetteer()
+        self.place = np.array([gazetteer.position(i.location_id) for i in internships], dtype=np.int64)
+        self.remote = np.array([bool(i.is_remote) for i in internships], dtype=bool)
+        self.unplaced = (self.place == gazetteer.unknown) & ~self.remote
+
+        # sector text is kept for exact-match filters; scoring uses taxonomy positions
+        self.sector_ids, self.sectors = _factorize([i.sector for i in internships])
+        self.sector_position = np.array([get_taxonomy().position(i.sector_id) for i in internships], dtype=np.int64)
+
+        self.course_ids, self.courses = _factorize([i.preferred_course for i in internships])
+
+        self.year_requirement_ids, self.year_requirements = _factorize([i.year_of_study_requirement for i in internships])
+        self.year_any = _contains(self.year_requirements, "any")
+        self.year_final = _contains(self.year_requirements, "final")
+        self.year_junior = _contains(self.year_requirements, "junior")
+
+    def __len__(self):
+        return len(self.internship_ids)
+
+    @property
+    def open_mask(self):
+        """Internships with a free position whose application deadline has not passed"""
+        now = np.datetime64(datetime.utcnow(), "us")
+        return (self.filled_positions < self.total_positions) & ~(self.deadline < now)
+
+    def filter_mask(self, sector=None, location=None, min_stipend=None):
+        """Internships matching an exact sector, a location substring and a minimum stipend"""
+        mask = np.ones(len(self), dtype=bool)
+        if sector:
+            mask &= _gather(self.sectors == sector.strip().lower(), self.sector_ids, False)
+        if location:
+            mask &= _gather(_contains(self.locations, location.strip().lower()), self.location_ids, False)
+        if min_stipend:
+            mask &= self.stipend >= min_stipend
+        return mask
+
+    def location_scores(self, preferred_ids, current_id):
+        """Distance-decayed location score, as in ``gazetteer.location_score``"""
+        gazetteer = get_gazetteer()
+        preferred = np.zeros(len(gazetteer) + 1, dtype=np.float64)
+        if preferred_ids:
+            preferred = gazetteer.decay[gazetteer.positions(preferred_ids)].max(axis=0)
+        table = 0.8 * preferred + 0.6 * gazetteer.decay[gazetteer.position(current_id)]
+
+        score = table[self.place]
+        score += np.where(self.remote, 0.7, 0.0)
+        return np.where(self.unplaced, 0.5, np.minimum(score, 1.0))
+
+    def academic_scores(self, student):
+        score = np.zeros(len(self), dtype=np.float64)
+
+        if student.cgpa:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.minimum(student.cgpa / self.min_cgpa * 0.4, 0.5)
+            has_min = self.min_cgpa != 0
+            score += np.where(
+                has_min,
+                np.where(student.cgpa >= self.min_cgpa, ratio, -0.3),
+                min(student.cgpa / 10 * 0.4, 0.4),
+            )
+
+        if student.course:
+            table = np.where(_contains(self.courses, student.course.lower()), 0.3, 0.0)
+            score += _gather(table, self.course_ids, 0.0)
+
+        if student.year_of_study:
+            year = student.year_of_study
+            table = np.where(
+                self.year_any | _contains(self.year_requirements, str(year))
+                | (self.year_final & (year >= 3))
+                | (self.year_junior & (year <= 2)),
+                0.2,
+                0.0,
+            )
+            score += _gather(table, self.year_requirement_ids, 0.0)
+
+        return np.maximum(0, np.minimum(score, 1.0))
+
+    def affirmative_scores(self, student):
+        score = np.zeros(len(self), dtype=np.float64)
+
+        if student.social_category and student.social_category != "General":
+            quota = self.quotas.get(student.social_category.lower())
+            if quota is not None:
+                score += np.where(quota > 0, 0.3, 0.0)
+
+        if student.district_type and student.district_type.lower() in ["rural", "aspirational"]:
+            score += np.where(self.quotas["rural"] > 0, 0.25, 0.15)
+
+        if not student.pm_scheme_participant:
+            score += 0.1
+
+        if (student.previous_internships or 0) <= 1:
+            score += 0.1
+
+        return np.minimum(score, 1.0)
+
+    def sector_scores(self, interest_ids):
+        """Best taxonomy similarity between any interest and each internship's sector"""
+        taxonomy = get_taxonomy()
+        interests = taxonomy.known(interest_ids)
+        if not interests:
+            return np.full(len(self), UNKNOWN_SECTOR, dtype=np.float64)
+
+        table = taxonomy.similarity[taxonomy.positions(interests)].max(axis=0)
+        return np.where(self.sector_position == taxonomy.unknown, UNKNOWN_SECTOR, table[self.sector_position])
+
+    def component_scores(self, student):
+        """Location, academic, affirmative and sector scores against every internship"""
+        return {
+            "location": self.location_scores(student.preferred_location_ids, student.current_location_id),
+            "academic": self.academic_scores(student),
+            "affirmative": self.affirmative_scores(student),
+            "sector": self.sector_scores(student.sector_interest_ids),
+        }
+
+
+class StudentFeatureStore:
+    """Columnar view of every student, used to rank students against one internship.
+
+    The mirror image of ``InternshipFeatureStore``: string columns are factorized
+    once, so scoring an internship evaluates each distinct value once and
+    gathers the result over all students. ``skills`` holds the students' TF-IDF
+    rows and is rebuilt whenever the skills model is refitted.
+    """
+
+    def __init__(self, students):
+        self.student_ids = np.array([s.id for s in students], dtype=np.int64)
+        self.row_of = {sid: row for row, sid in enumerate(self.student_ids.tolist())}
+        # parsed once here rather than on every refit of the skills model
+        self.skill_names = [parse_skills(student_skills_text(s)) for s in students]
+        self.skills = None
+        self.model_version = None
+
+        self.cgpa = np.array([s.cgpa or 0.0 for s in students], dtype=np.float64)
+        self.year = np.array([s.year_of_study or 0 for s in students], dtype=np.int64)
+        self.previous_internships = np.array([s.previous_internships or 0 for s in students], dtype=np.int64)
+        self.pm_scheme = np.array([bool(s.pm_scheme_participant) for s in students], dtype=bool)
+
+        gazetteer = get_gazetteer()
+        # each distinct preferred-place list once, padded with the "unknown" position
+        preferred = {}
+        self.preferred_ids = np.array(
+            [preferred.setdefault(tuple(s.preferred_location_ids or ()), len(preferred)) for s in students],
+            dtype=np.int64,
+        )
+        width = max((len(p) for p in preferred), default=0) or 1
+        self.preferred_places = np.full((len(preferred), width), gazetteer.unknown, dtype=np.int64)
+        for places, n in preferred.items():
+            self.preferred_places[n, :len(places)] = gazetteer.positions(places)
+        self.current_place = np.array([gazetteer.position(s.current_location_id) for s in students], dtype=np.int64)
+        self.course_ids, self.courses = _factorize([s.course for s in students])
+        self.category_ids, self.categories = _factorize([s.social_category for s in students])
+        self.district_ids, self.districts = _factorize([s.district_type for s in students])
+
+        taxonomy = get_taxonomy()
+        interests = {}
+        self.interest_ids = np.array(
+            [interests.setdefault(tuple(taxonomy.known(s.sector_interest_ids)), len(interests)) for s in students],
+            dtype=np.int64,
+        )
+        width = max((len(i) for i in interests), default=0) or 1
+        self.interest_sectors = np.full((len(interests), width), taxonomy.unknown, dtype=np.int64)
+        for sectors, n in interests.items():
+            self.interest_sectors[n, :len(sectors)] = taxonomy.positions(sectors)
+        self.has_interests = np.array([bool(sectors) for sectors in interests], dtype=bool)[self.interest_ids]
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def fit_skills(self, model, model_version):
+        """This store with the students' TF-IDF rows in ``model``'s vocabulary.
+
+        Returns ``self`` when already fitted to ``model_version``, otherwise a
+        refitted shallow copy, so a store another thread is still scoring with
+        keeps the rows of the model it was fitted to.
+        """
+        if self.model_version == model_version:
+            return self
+        fitted = copy.copy(self)
+        fitted.skills = None
+        if not model.is_empty and len(self):
+            fitted.skills = model.vectorizer.transform(self.skill_names).tocsr()
+        fitted.model_version = model_version
+        return fitted
+
+    def filter_mask(self, social_category=None, district_type=None):
+        mask = np.ones(len(self), dtype=bool)
+        if social_category:
+            mask &= _gather(self.categories == social_category.strip().lower(), self.category_ids, False)
+        if district_type:
+            mask &= _gather(self.districts == district_type.strip().lower(), self.district_ids, False)
+        return mask
+
+    def skills_scores(self, internship_vector):
+        if self.skills is None or internship_vector is None or not internship_vector.nnz:
+            return np.zeros(len(self), dtype=np.float64)
+        return np.minimum((self.skills @ internship_vector.T).toarray().ravel(), 1.0)
+
+    def location_scores(self, internship):
+        gazetteer = get_gazetteer()
+        place = gazetteer.position(internship.location_id)
+        if place == gazetteer.unknown and not internship.is_remote:
+            return np.full(len(self), 0.5, dtype=np.float64)
+        column = gazetteer.decay[:, place]
+
+        preferred = column[self.preferred_places].max(axis=1)[self.preferred_ids]
+        score = 0.8 * preferred + 0.6 * column[self.current_place]
+        if internship.is_remote:
+            score += 0.7
+        return np.minimum(score, 1.0)
+
+    def academic_scores(self, internship):
+        score = np.zeros(len(self), dtype=np.float64)
+
+        has_cgpa = self.cgpa != 0
+        if internship.min_cgpa:
+            score += np.where(
+                has_cgpa,
+                np.where(self.cgpa >= internship.min_cgpa, np.minimum(self.cgpa / internship.min_cgpa * 0.4, 0.5), -0.3),
+                0.0,
+            )
+        else:
+            score += np.where(has_cgpa, np.minimum(self.cgpa / 10 * 0.4, 0.4), 0.0)
+
+        if internship.preferred_course:
+            preferred = internship.preferred_course.lower()
+            table = np.array([course in preferred for course in self.courses], dtype=bool)
+            score += _gather(np.where(table, 0.3, 0.0), self.course_ids, 0.0)
+
+        if internship.year_of_study_requirement:
+            req = internship.year_of_study_requirement.lower()
+            years = np.unique(self.year[self.year != 0])
+            eligible = [
+                year for year in years.tolist()
+                if "any" in req or str(year) in req
+                or ("final" in req and year >= 3)
+                or ("junior" in req and year <= 2)
+            ]
+            score += np.where(np.isin(self.year, eligible) & (self.year != 0), 0.2, 0.0)
+
+        return np.maximum(0, np.minimum(score, 1.0))
+
+    def affirmative_scores(self, internship):
+        table = np.array(
+            [category != "general" and (getattr(internship, f"{category}_quota", 0) or 0) > 0
+             for category in self.categories],
+            dtype=bool,
+        )
+        score = _gather(np.where(table, 0.3, 0.0), self.category_ids, 0.0)
+
+        rural = np.isin(self.districts, ["rural", "aspirational"])
+        bonus = 0.25 if (internship.rural_quota or 0) > 0 else 0.15
+        score += _gather(np.where(rural, bonus, 0.0), self.district_ids, 0.0)
+
+        score += np.where(self.pm_scheme, 0.0, 0.1)
+        score += np.where(self.previous_internships <= 1, 0.1, 0.0)
+        return np.minimum(score, 1.0)
+
+    def sector_scores(self, internship):
+        taxonomy = get_taxonomy()
+        position = taxonomy.position(internship.sector_id)
+        if position == taxonomy.unknown:
+            return np.full(len(self), UNKNOWN_SECTOR, dtype=np.float64)
+        best = taxonomy.similarity[self.interest_sectors, position].max(axis=1)
+        return np.where(self.has_interests, best[self.interest_ids], UNKNOWN_SECTOR)
+
+    def component_scores(self, internship, internship_vector):
+        """All five component scores of every student against ``internship``"""
+        return {
+            "skills": self.skills_scores(internship_vector),
+            "location": self.location_scores(internship),
+            "academic": self.academic_scores(internship),
+            "affirmative": self.affirmative_scores(internship),
+            "sector": self.sector_scores(internship),
+        }
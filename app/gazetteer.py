@@ -0,0 +1,162 @@
+import csv
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+REMOTE_TERMS = ("remote", "work from home", "wfh")
+# places this close count as the same labour market
+NEAR_KM = 30.0
+# beyond NEAR_KM the score halves about every 100 km
+DECAY_KM = 150.0
+EARTH_RADIUS_KM = 6371.0
+
+Place = namedtuple("Place", "id name state latitude longitude aliases")
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments are broadcastable arrays in degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _clean(text):
+    return " ".join(text.lower().replace(".", " ").split())
+
+
+class NameIndex:
+    """Resolves free text to ids of known names and aliases.
+
+    Text is split on commas, semicolons, slashes and pipes. Each part is
+    looked up as a whole first, then by the longest known name it contains
+    as whole words. Parts listed in ``ignore`` never resolve.
+    """
+
+    def __init__(self, names, ignore=()):
+        self.id_of = {}
+        for name, value in names:
+            self.id_of.setdefault(_clean(name), value)
+        self.ignore = {_clean(i) for i in ignore} - set(self.id_of)
+        longest_first = sorted(self.id_of, key=len, reverse=True)
+        self._pattern = None
+        if longest_first:
+            self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(n) for n in longest_first) + r")\b")
+
+    def resolve(self, text):
+        """Ids mentioned in ``text``, in order of appearance, without repeats"""
+        ids = []
+        for part in re.split(r"[,;/|]", text or ""):
+            part = _clean(part)
+            if not part or part in self.ignore:
+                continue
+            value = self.id_of.get(part)
+            if value is None and self._pattern is not None:
+                found = self._pattern.search(part)
+                value = self.id_of[found.group(0)] if found else None
+            if value is not None and value not in ids:
+                ids.append(value)
+        return ids
+
+
+class Gazetteer:
+    """Known places with coordinates and a precomputed place-to-place decay matrix.
+
+    Free-text locations resolve to place ids through a ``NameIndex``, so
+    "Delhi" and "New Delhi" stay distinct. State names are only qualifiers
+    ("Pune, Maharashtra") and never resolve on their own.
+
+    ``decay`` is indexed by position, not id, and has an extra all-zero row
+    and column at position ``len(self)`` for "unknown", so scorers can gather
+    without masking. Every scoring path reads the same matrix, which keeps
+    their results bit for bit identical.
+    """
+
+    def __init__(self, places):
+        self.places = list(places)
+        self.ids = np.array([p.id for p in self.places], dtype=np.int64)
+        self.pos_of = {p.id: n for n, p in enumerate(self.places)}
+        self.latitude = np.array([p.latitude for p in self.places], dtype=np.float64)
+        self.longitude = np.array([p.longitude for p in self.places], dtype=np.float64)
+
+        self.names = NameIndex(
+            ((name, p.id) for p in self.places for name in (p.name, *p.aliases)),
+            ignore={p.state for p in self.places},
+        )
+
+        distance = haversine_km(
+            self.latitude[:, None], self.longitude[:, None], self.latitude[None, :], self.longitude[None, :]
+        )
+        self.decay = np.zeros((len(self) + 1, len(self) + 1), dtype=np.float64)
+        self.decay[:-1, :-1] = np.exp(-np.maximum(distance - NEAR_KM, 0.0) / DECAY_KM)
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            places = [
+                Place(
+                    id=int(row["id"]),
+                    name=row["name"],
+                    state=row["state"],
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                    aliases=tuple(a for a in (row["aliases"] or "").split("|") if a),
+                )
+                for row in csv.DictReader(f)
+            ]
+        return cls(places)
+
+    def __len__(self):
+        return len(self.places)
+
+    @property
+    def unknown(self):
+        """Position of the all-zero "unknown" row and column of ``decay``"""
+        return len(self.places)
+
+    def resolve(self, text):
+        """Place ids mentioned in ``text``, in order of appearance"""
+        return self.names.resolve(text)
+
+    def is_remote(self, text):
+        text = (text or "").lower()
+        return any(term in text for term in REMOTE_TERMS)
+
+    def primary(self, text):
+        """First place mentioned in ``text``, or None"""
+        ids = self.resolve(text)
+        return ids[0] if ids else None
+
+    def position(self, place_id):
+        return self.pos_of.get(place_id, self.unknown)
+
+    def positions(self, place_ids):
+        return np.array([self.position(p) for p in place_ids or ()], dtype=np.int64)
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer():
+    """The bundled gazetteer, loaded once per process"""
+    return Gazetteer.from_csv()
+
+
+def location_score(preferred_ids, current_id, location_id, remote):
+    """Scalar location score for one pair; the feature stores compute the same thing vectorized.
+
+    Preferred locations contribute 0.8 and the current location 0.6, each
+    scaled by the distance decay to the internship, and a remote internship
+    adds 0.7, capped at 1. An internship with no known place that is not
+    remote gets a neutral 0.5.
+    """
+    g = get_gazetteer()
+    column = g.position(location_id)
+    if column == g.unknown and not remote:
+        return 0.5
+    preferred = max((g.decay[g.position(p), column] for p in preferred_ids or ()), default=0.0)
+    score = 0.8 * preferred + 0.6 * g.decay[g.position(current_id), column]
+    if remote:
+        score += 0.7
+    return float(min(score, 1.0))
@@ -0,0 +1,229 @@
+"""Database-backed background jobs for long match runs.
+
+Jobs live in the ``match_jobs`` table. A worker (a thread inside the web
+process, or ``flask match-worker``) claims the oldest queued job, or a running
+job whose heartbeat has gone stale, and processes students in id order. Each
+chunk's Match rows and the job's progress are committed together, so a job
+interrupted by a restart resumes from the last completed chunk.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, update
+
+from app.extensions import db
+from app.models import MatchJob, Student
+
+LOG = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_thread_lock = threading.Lock()
+_worker_thread = None
+
+
+def enqueue_job(kind="generate_all_matches", created_by=None, chunk_size=None, total=None, changed_only=True):
+    """Queue a job, or return the one of the same kind that is already queued or running.
+
+    ``total`` is the amount of work used for the progress bar; it defaults to
+    the number of students. ``changed_only`` off makes a match generation job
+    rematch every eligible student.
+    """
+    job = MatchJob.query.filter(MatchJob.kind == kind, MatchJob.status.in_(ACTIVE_STATUSES))\
+                        .order_by(MatchJob.id).first()
+    if job:
+        return job
+
+    job = MatchJob(
+        kind=kind,
+        created_by=created_by,
+        total_students=Student.query.count() if total is None else total,
+        chunk_size=chunk_size or current_app.config.get("MATCH_JOB_CHUNK_SIZE", 500),
+        changed_only=changed_only,
+    )
+    db.session.add(job)
+    db.session.commit()
+    LOG.info(f"Queued {kind} job {job.id}")
+    return job
+
+
+def _claimable():
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get("MATCH_JOB_STALE_SECONDS", 120))
+    return or_(
+        MatchJob.status == "queued",
+        and_(MatchJob.status == "running", MatchJob.heartbeat_at < stale_before),
+    )
+
+
+def _worker_token():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim_next_job(token):
+    """Atomically take ownership of the next runnable job, or return None"""
+    candidate = MatchJob.query.filter(_claimable()).order_by(MatchJob.id).first()
+    if not candidate:
+        return None
+
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(MatchJob)
+        .where(MatchJob.id == candidate.id, _claimable())
+        .values(
+            status="running",
+            claimed_by=token,
+            heartbeat_at=now,
+            started_at=func.coalesce(MatchJob.started_at, now),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+
+    if not claimed:
+        return None
+    db.session.refresh(candidate)
+    if candidate.cursor:
+        LOG.info(f"Resuming job {candidate.id} after student {candidate.cursor}")
+    return candidate
+
+
+def record_progress(job, token, processed, written, cursor):
+    """Advance the job's progress in the current transaction.
+
+    Returns False if another worker has since claimed the job, in which case
+    the caller must roll back its chunk.
+    """
+    updated = db.session.execute(
+        update(MatchJob)
+        .where(MatchJob.id == job.id, MatchJob.claimed_by == token)
+        .values(
+            cursor=cursor,
+            processed_students=MatchJob.processed_students + processed,
+            matches_written=MatchJob.matches_written + written,
+            heartbeat_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return bool(updated)
+
+
+def run_generate_all_matches(job, token):
+    from app.matching_engine import matching_engine
+
+    if not job.total_students:
+        job.total_students = matching_engine.rematch_query(job.changed_only).count()
+        db.session.commit()
+
+    while True:
+        cursor = db.session.query(MatchJob.cursor).filter(MatchJob.id == job.id).scalar() or 0
+        chunk = next(matching_engine.student_chunks(
+            matching_engine.rematch_query(job.changed_only).filter(Student.id > cursor), job.chunk_size or 500), None)
+        if chunk is None:
+            return True
+
+        records, versions = chunk
+        written = matching_engine.generate_matches_for_chunk(records, versions)
+        if not record_progress(job, token, len(records), written, records[-1].id):
+            db.session.rollback()
+            LOG.warning(f"Lost ownership of job {job.id}; stopping")
+            return False
+        db.session.commit()
+
+
+def run_sweep_matches(job, token):
+    from app.matching_engine import matching_engine
+
+    totals = Counter(job.stats or {})
+    while True:
+        stats = matching_engine.sweep_batch(batch_size=job.chunk_size or 500)
+        if not stats["examined"]:
+            return True
+
+        totals.update(stats)
+        if not record_progress(job, token, stats["examined"], stats["rescored"], job.cursor or 0):
+            db.session.rollback()
+            LOG.warning(f"Lost ownership of job {job.id}; stopping")
+            return False
+        db.session.execute(
+            update(MatchJob).where(MatchJob.id == job.id).values(stats=dict(totals))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+JOB_HANDLERS = {
+    "generate_all_matches": run_generate_all_matches,
+    "sweep_matches": run_sweep_matches,
+}
+
+
+def run_job(job, token):
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind {job.kind!r}")
+        if not handler(job, token):
+            return
+        db.session.execute(
+            update(MatchJob)
+            .where(MatchJob.id == job.id, MatchJob.claimed_by == token)
+            .values(status="completed", finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        LOG.info(f"Job {job.id} completed")
+    except Exception as e:
+        LOG.exception(f"Job {job.id} failed: {e}")
+        db.session.rollback()
+        db.session.execute(
+            update(MatchJob)
+            .where(MatchJob.id == job.id, MatchJob.claimed_by == token)
+            .values(status="failed", error=str(e), finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+def run_pending_jobs():
+    """Run claimable jobs until there are none left; returns how many were run"""
+    token = _worker_token()
+    count = 0
+    while True:
+        job = claim_next_job(token)
+        if job is None:
+            return count
+        run_job(job, token)
+        count += 1
+
+
+def _thread_main(app):
+    with app.app_context():
+        try:
+            run_pending_jobs()
+        finally:
+            db.session.remove()
+
+
+def ensure_worker_thread(app):
+    """Start the in-process job thread if it is enabled and not already running"""
+    global _worker_thread
+    if not app.config.get("MATCH_JOB_THREAD", True):
+        return
+    with _thread_lock:
+        if _worker_thread is not None and _worker_thread.is_alive():
+            return
+        _worker_thread = threading.Thread(target=_thread_main, args=(app,), name="match-job-worker", daemon=True)
+        _worker_thread.start()
+
+
+def work_forever(poll_seconds=5):
+    """Loop used by ``flask match-worker``"""
+    while True:
+        if not run_pending_jobs():
+            time.sleep(poll_seconds)
@@ -1,17 +1,304 @@
 import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 import logging
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime
+from flask import current_app
 
+from sqlalchemy import and_, bindparam, func, or_, update
+from sqlalchemy.orm import selectinload
+
+from app.allocation import deferred_acceptance, graph_digest, student_categories
+from app.db_utils import insert_ignore, upsert
+from app.evaluation import LABELLED_STATUSES
 from app.extensions import db
-from app.models import Student, Internship, Match
+from app.feature_store import (
+    INTERNSHIP_FIELDS, STUDENT_FIELDS, InternshipFeatureStore, InternshipRecord, StudentFeatureStore, StudentRecord,
+)
+from app.gazetteer import get_gazetteer, location_score
+from app.models import (
+    Application, Student, Internship, Match, WeightProfile, assign_skills, internship_skills, parsed_skills,
+    student_skills,
+)
+from app.score_cache import PairScoreCache
+from app.scoring import (
+    BOUND_EPSILON, COMPONENTS, ENGINE_VERSION, MATCH_THRESHOLD, WEIGHTS,
+    keep_best, partial_scores, rerank, score_block, score_chunk, score_chunks_parallel, student_skills_text, weighted_total,
+)
+from app.sectors import get_taxonomy, sector_score
+from app.similarity_index import SimilarInternshipsIndex
+from app.skills_model import SkillsModel, preprocess_skills
+
+
+MATCH_KEY = ["student_id", "internship_id"]
+MATCH_UPDATE_COLUMNS = [
+    "overall_score", "skills_score", "location_score", "academic_score", "sector_score", "affirmative_action_score",
+    "engine_version", "weight_profile_id",
+]
+# stored column of each scoring component, in COMPONENTS order
+COMPONENT_COLUMNS = {
+    "skills": "skills_score",
+    "academic": "academic_score",
+    "location": "location_score",
+    "sector": "sector_score",
+    "affirmative": "affirmative_action_score",
+}
+# rows per round trip when a read-only projection is streamed with yield_per
+STREAM_ROWS = 1000
+
+# what a scoring pass reads together: the store's columns line up with the
+# model's rows, and ``version`` keys cached pair scores to the model
+Catalog = namedtuple("Catalog", "model store version")
+
+
+def weighted_sql(model, weights):
+    """SQL expression for the weighted sum of ``model``'s stored components, added in ``COMPONENTS`` order"""
+    terms = [getattr(model, COMPONENT_COLUMNS[k]) * weights[k] for k in COMPONENTS]
+    total = terms[0]
+    for term in terms[1:]:
+        total = total + term
+    return total
+
+
+def closed_internship_clause(now):
+    """SQL condition for internships that can no longer take applicants"""
+    return or_(
+        Internship.is_active.isnot(True),
+        func.coalesce(Internship.filled_positions, 0) >= func.coalesce(Internship.total_positions, 0),
+        and_(Internship.application_deadline.isnot(None), Internship.application_deadline < now),
+    )
 
 
 class InternshipMatchingEngine:
     def __init__(self):
         self.scaler = StandardScaler()
+        # the job thread and request threads share this engine; a Catalog is
+        # built under the lock and published with a single assignment
+        self._catalog = None
+        self._catalog_signature = None
+        self._catalog_lock = threading.Lock()
+        self.pruning_stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._model_version = 0
+        self._score_cache = None
+        self._student_store = None
+        self._student_signature = None
+        self._student_lock = threading.Lock()
+        self._similar_index = None
+        self._similar_signature = None
+        self._weights = None
+        self._weight_profile_id = None
+
+    def reset_pruning_stats(self):
+        with self._stats_lock:
+            self.pruning_stats = Counter()
+
+    def count_pruning(self, stats=None, **counts):
+        """Add per-stage counts to ``pruning_stats``"""
+        with self._stats_lock:
+            self.pruning_stats.update(stats or {}, **counts)
+
+    def pruning_summary(self):
+        """A copy of ``pruning_stats`` that is safe to read while matching runs"""
+        with self._stats_lock:
+            return dict(self.pruning_stats)
+
+    def _active_catalog_signature(self):
+        """Cheap fingerprints of the active internships, used to notice changes made by other workers.
+
+        The first covers what the skills model is fitted from: membership, and
+        ``updated_at`` for content edits (skills, min_cgpa, location, ...).
+        Only a change there refits the model and moves the model version that
+        keys cached pair scores. The second covers filled seats, which only
+        the feature store's open mask reads.
+        """
+        row = db.session.query(
+            func.count(Internship.id),
+            func.max(Internship.id),
+            func.max(Internship.updated_at),
+            func.sum(Internship.filled_positions),
+            # weighted by id so a seat filled here and one freed there don't cancel out
+            func.sum(Internship.filled_positions * Internship.id),
+        ).filter(Internship.is_active.is_(True)).one()
+        return tuple(row[:3]), tuple(row[3:])
+
+    def _load_weights(self):
+        profile = WeightProfile.query.filter_by(is_active=True).order_by(WeightProfile.id.desc()).first()
+        if profile is None:
+            self._weights, self._weight_profile_id = dict(WEIGHTS), None
+        else:
+            self._weights, self._weight_profile_id = dict(profile.weights), profile.id
+
+    @property
+    def weights(self):
+        """Component weights of the active profile, or the built-in ``WEIGHTS`` when none is active"""
+        if self._weights is None:
+            self._load_weights()
+        return self._weights
+
+    @property
+    def weight_profile_id(self):
+        """Id of the active weight profile; None for the built-in weights"""
+        if self._weights is None:
+            self._load_weights()
+        return self._weight_profile_id
+
+    def _load_catalog(self):
+        """The current Catalog, rebuilt first when the active internships have changed"""
+        # cheap, and picks up a profile activated by another worker
+        self._load_weights()
+        with self._catalog_lock:
+            signature = self._active_catalog_signature()
+            catalog = self._catalog
+            if catalog is not None and signature == self._catalog_signature:
+                return catalog
+
+            internships = [
+                InternshipRecord(**row._asdict()) for row in
+                db.session.query(*[getattr(Internship, f) for f in INTERNSHIP_FIELDS])
+                .filter(Internship.is_active.is_(True)).order_by(Internship.id).yield_per(STREAM_ROWS)
+            ]
+            if catalog is not None and signature[0] == self._catalog_signature[0]:
+                # only seats moved: same internships and vocabulary, so the model and version stay
+                catalog = catalog._replace(store=InternshipFeatureStore(internships))
+            else:
+                self._model_version += 1
+                catalog = Catalog(
+                    SkillsModel.from_internships(internships), InternshipFeatureStore(internships), self._model_version
+                )
+            self._catalog, self._catalog_signature = catalog, signature
+            return catalog
+
+    @property
+    def catalog(self):
+        """Skills model, feature store and model version of the active internships, checked for changes first.
+
+        Scoring paths take this once and read the model and store from it, so
+        a catalog swapped in by another thread meanwhile can't mix with them.
+        """
+        return self._load_catalog()
+
+    def _fitted_catalog(self):
+        # the published catalog without the change check, for per-pair paths
+        catalog = self._catalog
+        return catalog if catalog is not None else self._load_catalog()
+
+    @property
+    def skills_model(self):
+        """Shared skills model, fitted lazily over all active internships"""
+        return self._fitted_catalog().model
+
+    @property
+    def feature_store(self):
+        """Columnar features of all active internships, aligned with the skills model rows"""
+        return self.catalog.store
+
+    @property
+    def student_store(self):
+        """Columnar features of every student, fitted to the current skills model"""
+        return self._students_for(self.catalog)
+
+    def _students_for(self, catalog):
+        """The student store with skills rows in ``catalog``'s model, rebuilt when students are added or edited"""
+        signature = tuple(
+            db.session.query(func.count(Student.id), func.max(Student.id), func.max(Student.updated_at)).one()
+        )
+        with self._student_lock:
+            store = self._student_store
+            rebuilt = store is None or signature != self._student_signature
+            if rebuilt:
+                rows = db.session.query(*[getattr(Student, f) for f in STUDENT_FIELDS])\
+                                 .order_by(Student.id).yield_per(STREAM_ROWS)
+                store = StudentFeatureStore([StudentRecord(**row._asdict()) for row in rows])
+                self._student_signature = signature
+            fitted = store.fit_skills(catalog.model, catalog.version)
+            # a caller still on an older catalog doesn't roll the shared store back
+            if rebuilt or catalog.version > store.model_version:
+                self._student_store = fitted
+            return fitted
+
+    @property
+    def score_cache(self):
+        """LRU cache of pairwise component scores, sized by MATCH_SCORE_CACHE_MB"""
+        if self._score_cache is None:
+            megabytes = current_app.config.get("MATCH_SCORE_CACHE_MB", 16)
+            self._score_cache = PairScoreCache(max_bytes=int(megabytes * 1024 * 1024))
+        return self._score_cache
+
+    def skill_candidates(self, student_id, min_overlap=1):
+        """(internship id, shared skill count) of active internships sharing skills with a student, most shared first.
+
+        An indexed join of the skill association tables, so it never touches
+        the free-text columns.
+        """
+        shared = func.count(internship_skills.c.skill_id)
+        rows = (
+            db.session.query(internship_skills.c.internship_id, shared)
+            .join(student_skills, student_skills.c.skill_id == internship_skills.c.skill_id)
+            .join(Internship, Internship.id == internship_skills.c.internship_id)
+            .filter(student_skills.c.student_id == student_id, Internship.is_active.is_(True))
+            .group_by(internship_skills.c.internship_id)
+            .having(shared >= min_overlap)
+            .order_by(shared.desc(), internship_skills.c.internship_id)
+        )
+        return [(internship_id, count) for internship_id, count in rows]
+
+    def index_internship(self, internship):
+        """Bring the similar-internship index in line with a created or edited internship"""
+        if self._similar_index is not None:
+            if internship.is_active:
+                self._similar_index.upsert(internship)
+            else:
+                self._similar_index.remove(internship.id)
+            self._similar_signature = self._similar_catalog_signature()
+
+    def unindex_internship(self, internship_id):
+        """Drop a deleted internship from the similar-internship index"""
+        if self._similar_index is not None:
+            self._similar_index.remove(internship_id)
+            self._similar_signature = self._similar_catalog_signature()
+
+    def _similar_catalog_signature(self):
+        # filled seats don't matter here, only membership and content edits
+        return tuple(
+            db.session.query(
+                func.count(Internship.id),
+                func.max(Internship.id),
+                func.max(Internship.updated_at),
+            ).filter(Internship.is_active.is_(True)).one()
+        )
+
+    @property
+    def similar_index(self):
+        """Top-N similar active internships, rebuilt in full only when changes were missed or piled up"""
+        signature = self._similar_catalog_signature()
+        if (self._similar_index is None or signature != self._similar_signature
+                or self._similar_index.needs_refit()):
+            internships = Internship.query.filter_by(is_active=True).order_by(Internship.id).all()
+            self._similar_index = SimilarInternshipsIndex.from_internships(internships)
+            self._similar_signature = signature
+        return self._similar_index
+
+    def similar_internships(self, internship_id, n=5):
+        """The ``n`` most similar active internships as (Internship, score) pairs"""
+        try:
+            neighbours = self.similar_index.neighbours_of(internship_id, n)
+        except Exception as e:
+            logging.error(f"Similar internships error for {internship_id}: {e}")
+            return []
+        internships = {i.id: i for i in Internship.query.filter(Internship.id.in_([nid for nid, _ in neighbours]))}
+        return [(internships[nid], score) for nid, score in neighbours if nid in internships]
+
+    def refresh_catalog(self):
+        """Drop the fitted skills model and feature store so the next match run rebuilds them.
+
+        Scoring passes that already took the old catalog finish with it.
+        """
+        with self._catalog_lock:
+            self._catalog = None
+            self._catalog_signature = None
 
     def clear_matches_for_student(self, student_id):
         """Clear existing matches for a student"""
@@ -25,51 +312,27 @@ class InternshipMatchingEngine:
 
     def preprocess_skills(self, skills_text):
         """Normalize comma-separated skills"""
-        if not skills_text:
-            return ""
-        return " ".join(s.strip().lower() for s in skills_text.split(","))
+        return preprocess_skills(skills_text)
 
-    def calculate_skills_similarity(self, student_skills, internship_skills):
-        """Cosine similarity score"""
+    def student_skills_text(self, student):
+        return student_skills_text(student)
+
+    def calculate_skills_similarity(self, student_skills, internship_skills, model=None):
+        """Cosine similarity score, in ``model`` or else the shared skills model"""
         if not student_skills or not internship_skills:
             return 0.0
 
         try:
-            student_text = self.preprocess_skills(student_skills)
-            internship_text = self.preprocess_skills(internship_skills)
-
-            if not student_text or not internship_text:
-                return 0.0
-
-            vectorizer = TfidfVectorizer(stop_words="english", max_features=1000)
-            tfidf = vectorizer.fit_transform([student_text, internship_text])
-
-            sim = cosine_similarity(tfidf[0:1], tfidf[1:2])[0][0]
-            return float(min(sim, 1.0))
+            if model is None:
+                model = self.skills_model
+            return model.pair_similarity(student_skills, internship_skills)
         except Exception as e:
             logging.error(f"Skill similarity error: {e}")
             return 0.0
 
-    def calculate_location_score(self, preferred, current, internship_loc):
-        """Location matching score"""
-        if not internship_loc:
-            return 0.5
-
-        score = 0.0
-        internship_loc = internship_loc.lower()
-
-        if preferred:
-            pref_list = [p.strip().lower() for p in preferred.split(",")]
-            if any(p in internship_loc for p in pref_list):
-                score += 0.8
-
-        if current and current.lower() in internship_loc:
-            score += 0.6
-
-        if "remote" in internship_loc or "work from home" in internship_loc:
-            score += 0.7
-
-        return min(score, 1.0)
+    def calculate_location_score(self, preferred_ids, current_id, location_id, remote):
+        """Location matching score: distance decay between gazetteer places, plus a remote bonus"""
+        return location_score(preferred_ids, current_id, location_id, remote)
 
     def calculate_academic_score(self, student, internship):
         score = 0.0
@@ -118,27 +381,281 @@ class InternshipMatchingEngine:
 
         return min(score, 1.0)
 
-    def calculate_sector_interest_score(self, interests, sector):
-        if not interests or not sector:
-            return 0.5
+    def calculate_sector_interest_score(self, interest_ids, sector_id):
+        """Sector score: taxonomy similarity between the student's interests and the internship's sector"""
+        return sector_score(interest_ids, sector_id)
+
+    def score_components(self, student, internship, skills_score=None):
+        """All five component scores for one student/internship pair"""
+        if skills_score is None:
+            skills_score = self.calculate_skills_similarity(
+                self.student_skills_text(student),
+                internship.required_skills,
+            )
+
+        return {
+            "skills": skills_score,
+            "location": self.calculate_location_score(
+                student.preferred_location_ids,
+                student.current_location_id,
+                internship.location_id,
+                internship.is_remote,
+            ),
+            "academic": self.calculate_academic_score(student, internship),
+            "affirmative": self.calculate_affirmative_action_score(student, internship),
+            "sector": self.calculate_sector_interest_score(
+                student.sector_interest_ids, internship.sector_id
+            ),
+        }
+
+    def pair_scores(self, student, internship):
+        """Component scores for one pair, served from the score cache while neither side has changed"""
+        # the key's version and the skills score come from the same model
+        catalog = self._fitted_catalog()
+        key = PairScoreCache.key(student, internship, catalog.version)
+        scores = self.score_cache.get(key)
+        if scores is None:
+            skills_score = self.calculate_skills_similarity(
+                self.student_skills_text(student), internship.required_skills, model=catalog.model
+            )
+            scores = self.score_components(student, internship, skills_score=skills_score)
+            self.score_cache.put(key, scores)
+        return scores
+
+    def weighted_score(self, scores):
+        weights = self.weights
+        return sum(scores[k] * weights[k] for k in COMPONENTS)
+
+    def student_score_vectors(self, student, candidates=None, catalog=None):
+        """Component score vectors and weighted total of one student against every active internship.
+
+        The cheap components are computed first. Skills similarity, the expensive
+        one, is then only computed for open internships where the cheap part plus
+        the largest possible skills contribution can still reach the threshold,
+        and which share a skill with the student. Skipped pairs keep a
+        skills score of 0, so their overall score is only a lower bound.
+
+        ``candidates``, a boolean mask over the store, limits scoring further.
+        Pass the ``catalog`` the caller reads the store from, so columns line up.
+
+        Returns the scores, the overall score and the mask of internships at or
+        above the threshold. Per-stage counts are added to ``pruning_stats``.
+        """
+        if catalog is None:
+            catalog = self.catalog
+        store = catalog.store
+        weights = self.weights
+        student_text = self.student_skills_text(student)
+
+        scores = store.component_scores(student)
+        open_mask = store.open_mask
+        if candidates is not None:
+            self.count_pruning(pruned_filter=int((open_mask & ~candidates).sum()))
+            open_mask = open_mask & candidates
+        reachable = open_mask & (
+            partial_scores(scores, weights) + weights["skills"] + BOUND_EPSILON >= MATCH_THRESHOLD
+        )
+
+        overlap = np.zeros(len(store), dtype=bool)
+        cols = [store.col_of[i] for i, _ in self.skill_candidates(student.id) if i in store.col_of]
+        overlap[cols] = True
+
+        rows = np.flatnonzero(reachable & overlap)
+        scores["skills"] = catalog.model.similarities(student_text, rows=rows)
+
+        overall = weighted_total(scores, weights)
+
+        passed = reachable & (overall >= MATCH_THRESHOLD)
+        self.count_pruning(
+            pairs_considered=len(store),
+            pruned_capacity=int((~open_mask).sum()),
+            pruned_upper_bound=int((open_mask & ~reachable).sum()),
+            skills_skipped_no_overlap=int((reachable & ~overlap).sum()),
+            skills_scored=len(rows),
+            below_threshold=int((reachable & ~passed).sum()),
+            passed_threshold=int(passed.sum()),
+        )
+        return scores, overall, passed
+
+    def top_k(self, student, k=10, sector=None, location=None, min_stipend=None):
+        """The ``k`` best open internships for ``student`` above the threshold, best first.
+
+        Optional filters restrict the catalog to an exact sector, a location
+        substring and a minimum stipend before skills are scored. Selection is
+        an ``argpartition`` over the passing scores, so only the final ``k``
+        are sorted. Ties are broken by internship id.
+        """
+        catalog = self.catalog
+        store = catalog.store
+        candidates = None
+        if sector or location or min_stipend:
+            candidates = store.filter_mask(sector=sector, location=location, min_stipend=min_stipend)
+        scores, overall, passed = self.student_score_vectors(student, candidates=candidates, catalog=catalog)
+
+        cols = np.flatnonzero(passed)
+        if k < len(cols):
+            cols = cols[np.argpartition(-overall[cols], k - 1)[:k]]
+        cols = cols[np.lexsort((store.internship_ids[cols], -overall[cols]))]
+
+        return [
+            {
+                "internship_id": int(store.internship_ids[col]),
+                "overall_score": float(overall[col]),
+                "skills_score": float(scores["skills"][col]),
+                "location_score": float(scores["location"][col]),
+                "academic_score": float(scores["academic"][col]),
+                "sector_score": float(scores["sector"][col]),
+                "affirmative_action_score": float(scores["affirmative"][col]),
+            }
+            for col in cols
+        ]
 
-        interests = [i.strip().lower() for i in interests.split(",")]
-        sector_lower = sector.lower()
+    def rank_students(self, internship, page=1, per_page=20, social_category=None, district_type=None):
+        """Rank every student against one internship, best first, a page at a time.
 
-        if sector_lower in interests:
-            return 1.0
+        Scores come from the precomputed ``student_store``, so only the rows
+        on the requested page are ever sorted. Students can be filtered on the
+        affirmative-action fields. Returns the total number of students
+        considered and the page of score dicts.
+        """
+        catalog = self.catalog
+        store = self._students_for(catalog)
+        model = catalog.model
+        if internship.id in model.row_of:
+            vector = model.matrix[model.row_of[internship.id]]
+        else:
+            vector = model.transform(internship.required_skills)
 
-        related = {
-            "technology": ["software", "it", "tech"],
-            "finance": ["banking", "fintech"],
-            "healthcare": ["medical", "pharma"],
+        rows = np.flatnonzero(store.filter_mask(social_category=social_category, district_type=district_type))
+        if not len(rows):
+            return 0, []
+
+        scores = {k: v[rows] for k, v in store.component_scores(internship, vector).items()}
+        overall = weighted_total(scores, self.weights)
+
+        end = min(page * per_page, len(rows))
+        start = (page - 1) * per_page
+        if start >= end:
+            return len(rows), []
+        if end < len(rows):
+            top = np.argpartition(-overall, end - 1)[:end]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.lexsort((store.student_ids[rows][top], -overall[top]))][start:end]
+
+        return len(rows), [
+            {
+                "student_id": int(store.student_ids[rows[n]]),
+                "overall_score": float(overall[n]),
+                "skills_score": float(scores["skills"][n]),
+                "location_score": float(scores["location"][n]),
+                "academic_score": float(scores["academic"][n]),
+                "sector_score": float(scores["sector"][n]),
+                "affirmative_action_score": float(scores["affirmative"][n]),
+            }
+            for n in top
+        ]
+
+    def allocation_graph(self, source="matches", keep=None):
+        """Sparse score graph and constraints for the allocation solver.
+
+        Internships are the open ones with free seats. Students who already
+        hold an accepted application are left out. Edges come from the stored
+        matches, or with ``source="scores"`` from a fresh bulk scoring run that
+        keeps each student's best ``keep`` pairs.
+        """
+        catalog = self.catalog
+        store = catalog.store
+        capacity = store.total_positions - store.filled_positions
+        columns = np.flatnonzero(store.open_mask & (capacity > 0))
+        internship_ids = store.internship_ids[columns]
+
+        accepted = db.session.query(Application.student_id).filter(Application.status == "accepted")
+        students = db.session.query(Student.id, Student.social_category, Student.district_type)\
+                             .filter(Student.id.notin_(accepted)).order_by(Student.id).all()
+        student_ids = np.array([s.id for s in students], dtype=np.int64)
+
+        if source == "scores":
+            records = [StudentRecord(**row._asdict()) for row in
+                       db.session.query(*[getattr(Student, f) for f in STUDENT_FIELDS])
+                       .filter(Student.id.in_(student_ids.tolist())).order_by(Student.id).yield_per(STREAM_ROWS)]
+            size = self._chunk_size(len(columns), None)
+            parts = [keep_best(score_chunk(catalog.model, store, columns, records[n:n + size], self.weights), keep)
+                     for n in range(0, len(records), size)] if len(columns) else []
+            sids = np.concatenate([p.student_ids for p in parts]) if parts else np.empty(0, dtype=np.int64)
+            iids = np.concatenate([p.internship_ids for p in parts]) if parts else np.empty(0, dtype=np.int64)
+            scores = np.concatenate([p.overall for p in parts]) if parts else np.empty(0)
+        else:
+            rows = db.session.query(Match.student_id, Match.internship_id, Match.overall_score)\
+                             .filter(Match.internship_id.in_(internship_ids.tolist())).all()
+            sids = np.array([r[0] for r in rows], dtype=np.int64)
+            iids = np.array([r[1] for r in rows], dtype=np.int64)
+            scores = np.array([r[2] for r in rows], dtype=np.float64)
+
+        # map ids to positions, dropping edges to students who are left out
+        s_pos = np.searchsorted(student_ids, sids)
+        known = np.zeros(len(sids), dtype=bool)
+        if len(student_ids):
+            known = student_ids[np.minimum(s_pos, len(student_ids) - 1)] == sids
+        i_pos = np.searchsorted(internship_ids, iids)
+
+        return {
+            "student_ids": student_ids,
+            "internship_ids": internship_ids,
+            "edge_students": s_pos[known],
+            "edge_internships": i_pos[known],
+            "edge_scores": scores[known],
+            "capacity": capacity[columns],
+            "quotas": {c: store.quotas[c][columns] for c in store.quotas},
+            "eligible": [student_categories(s.social_category, s.district_type) for s in students],
         }
 
-        for category, keywords in related.items():
-            if any(k in sector_lower for k in keywords) and category in interests:
-                return 0.8
+    def allocate(self, source="matches", keep=None):
+        """Run the capacity- and quota-aware allocation; returns (Allocation, report metadata)"""
+        graph = self.allocation_graph(source=source, keep=keep)
+        allocation = deferred_acceptance(**graph)
+        meta = {
+            "source": source,
+            "keep": keep,
+            "engine_version": ENGINE_VERSION,
+            "weight_profile_id": self.weight_profile_id,
+            "graph_digest": graph_digest(
+                graph["student_ids"], graph["internship_ids"],
+                graph["edge_students"], graph["edge_internships"], graph["edge_scores"],
+            ),
+        }
+        logging.info(f"Allocation: {allocation.stats}")
+        return allocation, meta
 
-        return 0.3
+    def evaluation_dataset(self):
+        """Internships, students and labelled outcomes for ``evaluation.evaluate``.
+
+        Every internship is included, closed and filled ones too, since that is
+        where past acceptances went. Students are the ones with at least one
+        labelled application.
+        """
+        outcomes = db.session.query(Application.student_id, Application.internship_id, Application.status)\
+                             .filter(Application.status.in_(LABELLED_STATUSES))\
+                             .order_by(Application.id).all()
+        student_ids = sorted({o.student_id for o in outcomes})
+        internships = [
+            InternshipRecord(**row._asdict()) for row in
+            db.session.query(*[getattr(Internship, f) for f in INTERNSHIP_FIELDS])
+            .order_by(Internship.id).yield_per(STREAM_ROWS)
+        ]
+        students = []
+        for n in range(0, len(student_ids), 1000):
+            students.extend(
+                StudentRecord(**row._asdict()) for row in
+                db.session.query(*[getattr(Student, f) for f in STUDENT_FIELDS])
+                .filter(Student.id.in_(student_ids[n:n + 1000])).order_by(Student.id)
+            )
+        return internships, students, [tuple(o) for o in outcomes]
+
+    def matched_internship_ids(self, student_id):
+        """Ids of internships the student already has a match for, in one query"""
+        rows = db.session.query(Match.internship_id).filter(Match.student_id == student_id).all()
+        return {internship_id for (internship_id,) in rows}
 
     def generate_matches_for_student(self, student_id):
         try:
@@ -147,54 +664,42 @@ class InternshipMatchingEngine:
                 logging.error(f"Student {student_id} not found")
                 return []
 
-            internships = Internship.query.filter_by(is_active=True).all()
-            matches = []
-
-            for internship in internships:
+            catalog = self.catalog
+            store = catalog.store
+            scores, overall, passed = self.student_score_vectors(student, catalog=catalog)
+            existing = self.matched_internship_ids(student_id)
+            rows = []
 
-                if internship.filled_positions >= internship.total_positions:
-                    continue
+            for col in np.flatnonzero(passed):
+                internship_id = int(store.internship_ids[col])
 
-                if Match.query.filter_by(student_id=student_id, internship_id=internship.id).first():
+                if internship_id in existing:
                     continue
 
-                scores = {
-                    "skills": self.calculate_skills_similarity(
-                        f"{student.technical_skills} {student.soft_skills}",
-                        internship.required_skills,
-                    ),
-                    "location": self.calculate_location_score(
-                        student.preferred_locations,
-                        student.current_location,
-                        internship.location,
-                    ),
-                    "academic": self.calculate_academic_score(student, internship),
-                    "affirmative": self.calculate_affirmative_action_score(student, internship),
-                    "sector": self.calculate_sector_interest_score(
-                        student.sector_interests, internship.sector
-                    ),
-                }
-
-                weights = {"skills": 0.35, "academic": 0.25, "location": 0.20, "sector": 0.15, "affirmative": 0.05}
-
-                overall = sum(scores[k] * w for k, w in weights.items())
-
-                if overall >= 0.3:
-                    matches.append(
-                        Match(
-                            student_id=student_id,
-                            internship_id=internship.id,
-                            overall_score=float(overall),
-                            skills_score=scores["skills"],
-                            location_score=scores["location"],
-                            academic_score=scores["academic"],
-                            affirmative_action_score=scores["affirmative"],
-                        )
-                    )
+                rows.append(
+                    {
+                        "student_id": student_id,
+                        "internship_id": internship_id,
+                        "overall_score": float(overall[col]),
+                        "skills_score": float(scores["skills"][col]),
+                        "location_score": float(scores["location"][col]),
+                        "academic_score": float(scores["academic"][col]),
+                        "sector_score": float(scores["sector"][col]),
+                        "affirmative_action_score": float(scores["affirmative"][col]),
+                        "engine_version": ENGINE_VERSION,
+                        "weight_profile_id": self.weight_profile_id,
+                    }
+                )
 
-            db.session.add_all(matches)
+            keep = self.keep_per_student()
+            if keep:
+                rows = sorted(rows, key=lambda r: r["overall_score"], reverse=True)[:keep]
+            insert_ignore(Match, rows)
+            self.trim_student_matches([student_id], keep)
+            self.mark_rematched([(student_id, student.profile_version)])
             db.session.commit()
 
+            matches = [Match(**row) for row in rows]
             return sorted(matches, key=lambda x: x.overall_score, reverse=True)
 
         except Exception as e:
@@ -202,58 +707,551 @@ class InternshipMatchingEngine:
             db.session.rollback()
             return []
 
-    def generate_all_matches(self):
+    def rematch_query(self, changed_only=True):
+        """Students a batch run should match, in id order.
+
+        Students below ``MATCH_COMPLETENESS_THRESHOLD`` are never matched in
+        bulk. With ``changed_only``, neither are students whose scored fields
+        haven't changed since they were last matched: new and edited
+        internships are matched against everyone as they are written, so
+        their matches are already current. Both conditions are served by one
+        index on (needs_rematch, profile_completeness).
+        """
+        threshold = current_app.config.get("MATCH_COMPLETENESS_THRESHOLD", 70)
+        query = Student.query.filter(Student.profile_completeness >= threshold)
+        if changed_only:
+            query = query.filter(Student.needs_rematch.is_(True))
+        return query.order_by(Student.id)
+
+    def student_chunks(self, query, chunk_size):
+        """Yield (records, versions) for the students ``query`` selects, ``chunk_size`` at a time.
+
+        Only the scored columns are read, straight into ``StudentRecord``
+        slots, with each student's (id, profile version) alongside. Pages are
+        fetched by id instead of through one open cursor, so memory depends
+        on ``chunk_size`` alone and callers can write between pages.
+        """
+        columns = [getattr(Student, f) for f in STUDENT_FIELDS]
+        last_id = 0
+        while True:
+            rows = query.with_entities(*columns, Student.profile_version)\
+                        .filter(Student.id > last_id).order_by(None).order_by(Student.id)\
+                        .limit(chunk_size).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield [StudentRecord(**row._asdict()) for row in rows], [(row.id, row.profile_version) for row in rows]
+
+    def mark_rematched(self, versions):
+        """Clear ``needs_rematch`` for (student id, profile version) pairs, without committing.
+
+        A student edited since their version was read keeps the flag, so the
+        edit is picked up by the next run.
+        """
+        if not versions:
+            return 0
+        students = Student.__table__
+        return db.session.execute(
+            students.update()
+            .where(students.c.id == bindparam("sid"), students.c.profile_version == bindparam("version"))
+            # keep updated_at: it means "profile last edited" and keys the score caches
+            .values(needs_rematch=False, updated_at=students.c.updated_at),
+            [{"sid": sid, "version": version} for sid, version in versions],
+        ).rowcount
+
+    def generate_all_matches(self, bulk=True, memory_budget_mb=None, workers=None, chunk_size=None,
+                             changed_only=True):
+        """Generate matches for every eligible student (see ``rematch_query``).
+
+        The bulk mode scores students against all open internships as a
+        students x internships matrix, in chunks sized to ``memory_budget_mb``
+        (or ``chunk_size`` students), optionally across ``workers`` processes,
+        and writes every surviving pair in a single transaction.
+        """
+        if bulk:
+            return self.generate_all_matches_bulk(memory_budget_mb, workers, chunk_size, changed_only)
+
         try:
-            students = Student.query.all()
-            count = sum(len(self.generate_matches_for_student(s.id)) for s in students)
+            student_ids = [sid for (sid,) in self.rematch_query(changed_only).with_entities(Student.id)]
+            count = sum(len(self.generate_matches_for_student(sid)) for sid in student_ids)
             return count
         except Exception as e:
             logging.error(f"Bulk match error: {e}")
             return 0
 
-    def calculate_matching_scores(self, student):
-        internships = Internship.query.filter_by(is_active=True).all()
-        matches = []
+    def _chunk_size(self, n_internships, memory_budget_mb):
+        if memory_budget_mb is None:
+            memory_budget_mb = current_app.config.get("MATCH_BATCH_MEMORY_MB", 64)
+        # one float64 matrix per component plus the overall score and the mask
+        bytes_per_student = max(n_internships, 1) * 8 * (len(COMPONENTS) + 2)
+        return max(1, int(memory_budget_mb * 1024 * 1024 // bytes_per_student))
 
-        for internship in internships:
-            if internship.filled_positions >= internship.total_positions:
-                continue
+    def score_matrix(self, students, columns=None):
+        """Component score matrices (students x internships) and the weighted total.
 
-            if Match.query.filter_by(student_id=student.id, internship_id=internship.id).first():
-                continue
+        ``columns`` selects a subset of the feature store's internship columns.
+        As in ``student_score_vectors``, skills similarity is skipped for pairs
+        that cannot reach the threshold; those keep a skills score of 0.
+        """
+        catalog = self.catalog
+        store = catalog.store
+        if columns is None:
+            columns = np.arange(len(store))
+        scores, overall, _, stats = score_block(catalog.model, store, students, columns, self.weights)
+        self.count_pruning(stats)
+        return scores, overall
 
-            scores = {
-                "skills": self.calculate_skills_similarity(
-                    f"{student.technical_skills} {student.soft_skills}",
-                    internship.required_skills,
-                ),
-                "location": self.calculate_location_score(
-                    student.preferred_locations,
-                    student.current_location,
-                    internship.location,
-                ),
-                "academic": self.calculate_academic_score(student, internship),
-                "affirmative": self.calculate_affirmative_action_score(student, internship),
-                "sector": self.calculate_sector_interest_score(
-                    student.sector_interests, internship.sector
-                ),
+    def generate_all_matches_bulk(self, memory_budget_mb=None, workers=None, chunk_size=None, changed_only=True):
+        try:
+            model, store, _ = self.catalog
+            columns = np.flatnonzero(store.open_mask)
+            query = self.rematch_query(changed_only)
+            total = query.count()
+            if not total:
+                return 0
+
+            if workers is None:
+                workers = current_app.config.get("MATCH_WORKERS", 1)
+            if not chunk_size:
+                chunk_size = current_app.config.get("MATCH_CHUNK_SIZE") or self._chunk_size(len(columns), memory_budget_mb)
+            n_chunks = -(-total // chunk_size)
+            closed = len(store) - len(columns)
+
+            def chunks():
+                # students are read a page at a time as the scorer asks for them
+                for records, versions in self.student_chunks(query, chunk_size):
+                    self.mark_rematched(versions)
+                    self.count_pruning(
+                        pairs_considered=closed * len(records),
+                        pruned_capacity=closed * len(records),
+                    )
+                    if len(columns):
+                        yield records
+
+            if not len(columns):
+                for _ in chunks():
+                    pass
+                db.session.commit()
+                return 0
+
+            if workers > 1 and n_chunks > 1:
+                results = score_chunks_parallel(model, store, columns, chunks(), workers, self.weights)
+            else:
+                results = (score_chunk(model, store, columns, chunk, self.weights) for chunk in chunks())
+
+            # results arrive in chunk order whatever the worker count, so the
+            # written rows are the same for serial and parallel runs
+            count = 0
+            for result in results:
+                self.count_pruning(result.stats)
+                count += self._write_chunk(result)
+
+            db.session.commit()
+            logging.info(
+                f"Bulk matching wrote {count} matches for {total} students "
+                f"in {n_chunks} chunks of {chunk_size} on {workers} worker(s)"
+            )
+            logging.info(f"Pruning stats: {self.pruning_summary()}")
+            return count
+
+        except Exception as e:
+            logging.error(f"Bulk match error: {e}")
+            db.session.rollback()
+            return 0
+
+    def generate_matches_for_chunk(self, records, versions):
+        """Score and write matches for one chunk from ``student_chunks``, without committing"""
+        model, store, _ = self.catalog
+        columns = np.flatnonzero(store.open_mask)
+        self.mark_rematched(versions)
+        if not len(columns) or not records:
+            return 0
+        result = score_chunk(model, store, columns, records, self.weights)
+        self.count_pruning(result.stats)
+        return self._write_chunk(result)
+
+    def _match_rows(self, result):
+        """Match row dicts for the pairs in a ChunkResult"""
+        profile_id = self.weight_profile_id
+        return [
+            {
+                "student_id": sid,
+                "internship_id": iid,
+                "overall_score": overall,
+                "skills_score": skills,
+                "location_score": location,
+                "academic_score": academic,
+                "sector_score": sector,
+                "affirmative_action_score": affirmative,
+                "engine_version": ENGINE_VERSION,
+                "weight_profile_id": profile_id,
             }
+            for sid, iid, overall, skills, location, academic, sector, affirmative in zip(
+                result.student_ids.tolist(),
+                result.internship_ids.tolist(),
+                result.overall.tolist(),
+                result.skills.tolist(),
+                result.location.tolist(),
+                result.academic.tolist(),
+                result.sector.tolist(),
+                result.affirmative.tolist(),
+            )
+        ]
+
+    def _write_chunk(self, result):
+        """Persist one scored chunk, skipping pairs that already have a Match row.
+
+        With a per-student limit, only each student's best pairs are written and
+        anything pushed out of the top ``keep`` is trimmed.
+        """
+        keep = self.keep_per_student()
+        result = keep_best(result, keep)
+        if not len(result.student_ids):
+            return 0
+
+        chunk_students = np.unique(result.student_ids).tolist()
+        existing = set(
+            db.session.query(Match.student_id, Match.internship_id)
+                      .filter(Match.student_id.in_(chunk_students)).all()
+        )
+
+        rows = [
+            row for row in self._match_rows(result)
+            if (row["student_id"], row["internship_id"]) not in existing
+        ]
+        insert_ignore(Match, rows)
+        self.trim_student_matches(chunk_students, keep)
+        return len(rows)
+
+    def keep_per_student(self):
+        """Most pending matches stored per student; 0 means no limit"""
+        return current_app.config.get("MATCH_KEEP_PER_STUDENT", 0)
+
+    def trim_student_matches(self, student_ids, keep=None):
+        """Delete pending matches beyond each student's best ``keep``, without committing.
+
+        Applied or accepted matches are never removed and do not count toward
+        the limit.
+        """
+        if keep is None:
+            keep = self.keep_per_student()
+        if not keep or not len(student_ids):
+            return 0
+
+        ranked = db.session.query(
+            Match.id,
+            func.row_number().over(
+                partition_by=Match.student_id,
+                order_by=(Match.overall_score.desc(), Match.internship_id),
+            ).label("rank"),
+        ).filter(Match.student_id.in_(student_ids), Match.status == "pending").subquery()
+        # ids are fetched first: MySQL cannot delete from a table it is selecting from
+        doomed = [row.id for row in db.session.query(ranked.c.id).filter(ranked.c.rank > keep)]
+        if not doomed:
+            return 0
+        return Match.query.filter(Match.id.in_(doomed)).delete(synchronize_session=False)
+
+    def compact_matches(self, keep=None, batch_size=500):
+        """Trim every student's stored matches to the best ``keep``, a batch of students per commit"""
+        if keep is None:
+            keep = self.keep_per_student()
+        if not keep:
+            return 0
+
+        removed = 0
+        last_id = 0
+        while True:
+            oversized = [
+                sid for (sid,) in db.session.query(Match.student_id)
+                .filter(Match.student_id > last_id, Match.status == "pending")
+                .group_by(Match.student_id)
+                .having(func.count(Match.id) > keep)
+                .order_by(Match.student_id)
+                .limit(batch_size)
+            ]
+            if not oversized:
+                break
+            last_id = oversized[-1]
+            removed += self.trim_student_matches(oversized, keep)
+            db.session.commit()
+
+        logging.info(f"Compaction removed {removed} matches beyond the best {keep} per student")
+        return removed
+
+    def closed_reason(self, internship, now=None):
+        """Why an internship can no longer take applicants ("inactive", "filled", "expired"), or None"""
+        now = now or datetime.utcnow()
+        if not internship.is_active:
+            return "inactive"
+        if (internship.filled_positions or 0) >= (internship.total_positions or 0):
+            return "filled"
+        if internship.application_deadline and internship.application_deadline < now:
+            return "expired"
+        return None
+
+    def count_stale_matches(self):
+        """Pending matches the sweeper would delete or rescore"""
+        return Match.query.join(Internship, Match.internship_id == Internship.id).filter(
+            Match.status == "pending",
+            or_(
+                closed_internship_clause(datetime.utcnow()),
+                Match.engine_version.is_(None),
+                Match.engine_version != ENGINE_VERSION,
+            ),
+        ).count()
+
+    def sweep_batch(self, batch_size=500, rescore=True):
+        """Clean up one batch of stale pending matches, without committing.
+
+        Matches of internships that are inactive, filled or past their deadline
+        are deleted first. Once none are left, matches scored by an older
+        ``ENGINE_VERSION`` are rescored in place for up to ``batch_size``
+        students, or deleted when ``rescore`` is off. A rescored match that no
+        longer reaches the threshold is deleted. Returns a Counter whose
+        ``examined`` entry is 0 when there is nothing left to sweep.
+        """
+        stats = Counter()
+        now = datetime.utcnow()
+
+        closed = db.session.query(Match.id, Internship)\
+                           .join(Internship, Match.internship_id == Internship.id)\
+                           .filter(Match.status == "pending", closed_internship_clause(now))\
+                           .limit(batch_size).all()
+        if closed:
+            for _, internship in closed:
+                stats[f"deleted_{self.closed_reason(internship, now) or 'closed'}"] += 1
+            Match.query.filter(Match.id.in_([match_id for match_id, _ in closed]))\
+                       .delete(synchronize_session=False)
+            stats["examined"] = len(closed)
+            return stats
+
+        outdated = or_(Match.engine_version.is_(None), Match.engine_version != ENGINE_VERSION)
+        student_ids = [
+            sid for (sid,) in db.session.query(Match.student_id).distinct()
+            .filter(Match.status == "pending", outdated)
+            .order_by(Match.student_id).limit(batch_size)
+        ]
+        if not student_ids:
+            return stats
 
-            weights = {"skills": 0.35, "academic": 0.25, "location": 0.20, "sector": 0.15, "affirmative": 0.05}
+        stale = db.session.query(Match.id, Match.student_id, Match.internship_id)\
+                          .filter(Match.student_id.in_(student_ids), Match.status == "pending", outdated).all()
+        stats["examined"] = len(stale)
 
-            overall = sum(scores[k] * w for k, w in weights.items())
+        if not rescore:
+            Match.query.filter(Match.id.in_([m.id for m in stale])).delete(synchronize_session=False)
+            stats["deleted_outdated"] = len(stale)
+            return stats
 
-            if overall >= 0.3:
-                matches.append(
+        model, store, _ = self.catalog
+        columns = np.array(sorted({store.col_of[m.internship_id] for m in stale if m.internship_id in store.col_of}),
+                           dtype=np.int64)
+        students = [StudentRecord(**row._asdict())
+                    for row in db.session.query(*[getattr(Student, f) for f in STUDENT_FIELDS])
+                    .filter(Student.id.in_(student_ids)).order_by(Student.id)]
+        row_of = {s.id: r for r, s in enumerate(students)}
+        pos_of = {col: n for n, col in enumerate(columns.tolist())}
+
+        scores, overall, passed = None, None, None
+        if len(columns) and students:
+            scores, overall, passed, _ = score_block(model, store, students, columns, self.weights)
+
+        rows, doomed = [], []
+        for match in stale:
+            col = store.col_of.get(match.internship_id)
+            r = row_of.get(match.student_id)
+            if col is None or r is None or not passed[r, pos_of[col]]:
+                doomed.append(match.id)
+                continue
+            c = pos_of[col]
+            rows.append({
+                "student_id": match.student_id,
+                "internship_id": match.internship_id,
+                "overall_score": float(overall[r, c]),
+                "skills_score": float(scores["skills"][r, c]),
+                "location_score": float(scores["location"][r, c]),
+                "academic_score": float(scores["academic"][r, c]),
+                "sector_score": float(scores["sector"][r, c]),
+                "affirmative_action_score": float(scores["affirmative"][r, c]),
+                "engine_version": ENGINE_VERSION,
+                "weight_profile_id": self.weight_profile_id,
+            })
+
+        upsert(Match, rows, MATCH_KEY, MATCH_UPDATE_COLUMNS)
+        if doomed:
+            Match.query.filter(Match.id.in_(doomed)).delete(synchronize_session=False)
+        stats["rescored"] = len(rows)
+        stats["deleted_below_threshold"] = len(doomed)
+        return stats
+
+    def sweep_stale_matches(self, batch_size=500, rescore=True):
+        """Run ``sweep_batch`` until nothing stale is left, committing each batch"""
+        totals = Counter()
+        try:
+            while True:
+                stats = self.sweep_batch(batch_size=batch_size, rescore=rescore)
+                if not stats["examined"]:
+                    break
+                db.session.commit()
+                totals.update(stats)
+                totals["batches"] += 1
+        except Exception as e:
+            logging.error(f"Error sweeping stale matches: {e}")
+            db.session.rollback()
+        logging.info(f"Stale match sweep: {dict(totals)}")
+        return totals
+
+    def retire_internship_matches(self, internship_id):
+        """Remove the pending matches of an internship that is closed, filled or deleted"""
+        try:
+            num_deleted = Match.query.filter_by(internship_id=internship_id, status="pending")\
+                                     .delete(synchronize_session=False)
+            db.session.commit()
+            logging.info(f"Retired {num_deleted} matches for internship {internship_id}")
+            return num_deleted
+        except Exception as e:
+            logging.error(f"Error retiring matches for internship {internship_id}: {e}")
+            db.session.rollback()
+            return 0
+
+    def rematch_internship(self, internship):
+        """Rescore one created or edited internship against every eligible student.
+
+        Students are those ``rematch_query(changed_only=False)`` selects, scored
+        all at once from the columnar ``student_store``. Existing Match rows
+        are updated in place, new pairs above the threshold are inserted and
+        pending matches that fall below it (or whose student is no longer
+        eligible) are removed.
+        """
+        if self.closed_reason(internship):
+            return self.retire_internship_matches(internship.id)
+
+        try:
+            # picks up content edits made since the catalog was loaded
+            catalog = self.catalog
+            model = catalog.model
+            if internship.id in model.row_of:
+                vector = model.matrix[model.row_of[internship.id]]
+            else:
+                vector = model.transform(internship.required_skills)
+
+            store = self._students_for(catalog)
+            eligible = [sid for (sid,) in self.rematch_query(changed_only=False).with_entities(Student.id)]
+            rows = np.flatnonzero(np.isin(store.student_ids, eligible))
+            scores = {k: v[rows] for k, v in store.component_scores(internship, vector).items()}
+            overall = weighted_total(scores, self.weights)
+            passed = np.flatnonzero(overall >= MATCH_THRESHOLD)
+            student_ids = store.student_ids[rows]
+
+            chunk = current_app.config.get("MATCH_JOB_CHUNK_SIZE", 500)
+            profile_id = self.weight_profile_id
+            for start in range(0, len(passed), chunk):
+                part = passed[start:start + chunk]
+                matches = [
                     {
+                        "student_id": int(student_ids[n]),
                         "internship_id": internship.id,
-                        "overall_score": float(overall),
-                        "skills_score": scores["skills"],
-                        "location_score": scores["location"],
-                        "academic_score": scores["academic"],
-                        "affirmative_action_score": scores["affirmative"],
+                        "overall_score": float(overall[n]),
+                        "skills_score": float(scores["skills"][n]),
+                        "location_score": float(scores["location"][n]),
+                        "academic_score": float(scores["academic"][n]),
+                        "sector_score": float(scores["sector"][n]),
+                        "affirmative_action_score": float(scores["affirmative"][n]),
+                        "engine_version": ENGINE_VERSION,
+                        "weight_profile_id": profile_id,
                     }
-                )
+                    for n in part.tolist()
+                ]
+                upsert(Match, matches, MATCH_KEY, MATCH_UPDATE_COLUMNS)
+                self.trim_student_matches(student_ids[part].tolist())
+
+            kept = set(student_ids[passed].tolist())
+            pending = db.session.query(Match.student_id)\
+                                .filter(Match.internship_id == internship.id, Match.status == "pending")
+            dropped = [sid for (sid,) in pending if sid not in kept]
+            for start in range(0, len(dropped), chunk):
+                Match.query.filter(
+                    Match.internship_id == internship.id,
+                    Match.student_id.in_(dropped[start:start + chunk]),
+                    Match.status == "pending",
+                ).delete(synchronize_session=False)
+
+            db.session.commit()
+            logging.info(f"Rescored internship {internship.id}: {len(passed)} matches")
+            return len(passed)
+
+        except Exception as e:
+            logging.error(f"Error rescoring internship {internship.id}: {e}")
+            db.session.rollback()
+            return 0
+
+    def rematch_student(self, student):
+        """Rescore one student against every open internship after a profile change"""
+        try:
+            catalog = self.catalog
+            store = catalog.store
+            scores, overall, passed = self.student_score_vectors(student, catalog=catalog)
+            cols = np.flatnonzero(passed)
+            keep = self.keep_per_student()
+            if keep and keep < len(cols):
+                cols = cols[np.argsort(-overall[cols], kind="stable")[:keep]]
+
+            rows = [
+                {
+                    "student_id": student.id,
+                    "internship_id": int(store.internship_ids[col]),
+                    "overall_score": float(overall[col]),
+                    "skills_score": float(scores["skills"][col]),
+                    "location_score": float(scores["location"][col]),
+                    "academic_score": float(scores["academic"][col]),
+                    "sector_score": float(scores["sector"][col]),
+                    "affirmative_action_score": float(scores["affirmative"][col]),
+                    "engine_version": ENGINE_VERSION,
+                    "weight_profile_id": self.weight_profile_id,
+                }
+                for col in cols
+            ]
+            upsert(Match, rows, MATCH_KEY, MATCH_UPDATE_COLUMNS)
+            Match.query.filter(
+                Match.student_id == student.id,
+                Match.internship_id.notin_([row["internship_id"] for row in rows]),
+                Match.status == "pending",
+            ).delete(synchronize_session=False)
+            self.mark_rematched([(student.id, student.profile_version)])
+
+            db.session.commit()
+            logging.info(f"Rescored student {student.id}: {len(rows)} matches")
+            return len(rows)
+
+        except Exception as e:
+            logging.error(f"Error rescoring student {student.id}: {e}")
+            db.session.rollback()
+            return 0
+
+    def calculate_matching_scores(self, student):
+        catalog = self.catalog
+        store = catalog.store
+        scores, overall, passed = self.student_score_vectors(student, catalog=catalog)
+        existing = self.matched_internship_ids(student.id)
+        matches = []
+
+        for col in np.flatnonzero(passed):
+            internship_id = int(store.internship_ids[col])
+
+            if internship_id in existing:
+                continue
+
+            matches.append(
+                {
+                    "internship_id": internship_id,
+                    "overall_score": float(overall[col]),
+                    "skills_score": float(scores["skills"][col]),
+                    "location_score": float(scores["location"][col]),
+                    "academic_score": float(scores["academic"][col]),
+                    "sector_score": float(scores["sector"][col]),
+                    "affirmative_action_score": float(scores["affirmative"][col]),
+                }
+            )
 
         return sorted(matches, key=lambda x: x["overall_score"], reverse=True)
 
@@ -267,28 +1265,268 @@ class InternshipMatchingEngine:
 
     def calculate_match_percentage(self, student, internship):
         """Calculate match percentage for a student-internship pair"""
-        scores = {
-            "skills": self.calculate_skills_similarity(
-                f"{student.technical_skills} {student.soft_skills}",
-                internship.required_skills,
-            ),
-            "location": self.calculate_location_score(
-                student.preferred_locations,
-                student.current_location,
-                internship.location,
-            ),
-            "academic": self.calculate_academic_score(student, internship),
-            "affirmative": self.calculate_affirmative_action_score(student, internship),
-            "sector": self.calculate_sector_interest_score(
-                student.sector_interests, internship.sector
-            ),
+        overall = self.weighted_score(self.pair_scores(student, internship))
+        return round(overall * 100, 2)  # Return as percentage
+
+    def application_scores(self, application):
+        """Match score snapshot columns for an application"""
+        scores = self.pair_scores(application.student, application.internship)
+        return {
+            "match_percentage": round(self.weighted_score(scores) * 100, 2),
+            "skills_score": scores["skills"],
+            "location_score": scores["location"],
+            "academic_score": scores["academic"],
+            "sector_score": scores["sector"],
+            "affirmative_action_score": scores["affirmative"],
+            "scored_at": datetime.utcnow(),
         }
 
-        weights = {"skills": 0.35, "academic": 0.25, "location": 0.20, "sector": 0.15, "affirmative": 0.05}
+    def score_application(self, application):
+        """Set the match score snapshot on a new or unsaved application"""
+        for column, value in self.application_scores(application).items():
+            setattr(application, column, value)
 
-        overall = sum(scores[k] * w for k, w in weights.items())
-        return round(overall * 100, 2)  # Return as percentage
+    def rescore_applications(self, applications):
+        """Refresh the stored match scores of ``applications`` without committing.
+
+        ``updated_at`` is written back unchanged, so rescoring does not look like
+        a status update to the student.
+        """
+        rows = [
+            {"id": a.id, "updated_at": a.updated_at, **self.application_scores(a)}
+            for a in applications
+        ]
+        if rows:
+            db.session.execute(update(Application), rows)
+        return len(rows)
+
+    def rescore_applications_for(self, student_id=None, internship_id=None):
+        """Refresh the stored match scores after a student profile or internship changes"""
+        try:
+            query = Application.query
+            if student_id is not None:
+                query = query.filter_by(student_id=student_id)
+            if internship_id is not None:
+                query = query.filter_by(internship_id=internship_id)
+            count = self.rescore_applications(query.all())
+            db.session.commit()
+            return count
+        except Exception as e:
+            logging.error(f"Error rescoring applications (student {student_id}, internship {internship_id}): {e}")
+            db.session.rollback()
+            return 0
+
+    def backfill_profile_completeness(self, batch_size=500):
+        """Store profile completeness on students that predate the column, a batch per commit"""
+        count = 0
+        while True:
+            batch = Student.query.filter(Student.profile_completeness.is_(None))\
+                                 .order_by(Student.id).limit(batch_size).all()
+            if not batch:
+                break
+            for student in batch:
+                student.profile_completeness = student.calculate_profile_completeness()[0]
+            db.session.commit()
+            count += len(batch)
+        logging.info(f"Stored profile completeness for {count} students")
+        return count
+
+    def backfill_application_scores(self, batch_size=500, rescore_all=False):
+        """Score stored applications in id-ordered batches, committing after each.
+
+        Only applications without a snapshot are touched unless ``rescore_all``.
+        """
+        count = 0
+        last_id = 0
+        while True:
+            query = Application.query.filter(Application.id > last_id)
+            if not rescore_all:
+                query = query.filter(Application.match_percentage.is_(None))
+            batch = query.order_by(Application.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+            count += self.rescore_applications(batch)
+            db.session.commit()
+        logging.info(f"Backfilled match scores for {count} applications")
+        return count
+
+
+    def create_weight_profile(self, name, weights, activate=False):
+        """Store ``weights`` as the next version of profile ``name``.
+
+        Weights must cover exactly the five components, be non-negative and
+        sum to 1, so overall scores stay comparable with ``MATCH_THRESHOLD``.
+        """
+        weights = {k: float(v) for k, v in weights.items()}
+        if set(weights) != set(COMPONENTS):
+            raise ValueError(f"Weights must cover exactly {', '.join(COMPONENTS)}")
+        if any(w < 0 for w in weights.values()):
+            raise ValueError("Weights must be non-negative")
+        if abs(sum(weights.values()) - 1.0) > 1e-9:
+            raise ValueError(f"Weights must sum to 1, not {sum(weights.values()):g}")
+
+        latest = db.session.query(func.max(WeightProfile.version)).filter(WeightProfile.name == name).scalar()
+        profile = WeightProfile(
+            name=name,
+            version=(latest or 0) + 1,
+            weights={k: weights[k] for k in COMPONENTS},
+        )
+        db.session.add(profile)
+        db.session.commit()
+        if activate:
+            self.activate_weight_profile(profile)
+        return profile
+
+    def activate_weight_profile(self, profile):
+        """Make ``profile`` the one new scores are computed with; None goes back to the built-in weights.
+
+        Stored scores are not touched; run ``rerank_matches`` for that.
+        """
+        WeightProfile.query.filter(WeightProfile.is_active.is_(True)).update(
+            {"is_active": False}, synchronize_session=False
+        )
+        if profile is not None:
+            profile.is_active = True
+        db.session.commit()
+        self._load_weights()
+        logging.info(f"Active weight profile: {profile.label if profile else 'default'}")
+        return profile
+
+    def backfill_sector_scores(self, batch_size=1000):
+        """Store the sector component on matches written before it was kept, a batch per commit"""
+        count = 0
+        while True:
+            batch = db.session.query(Match.id, Student.sector_interest_ids, Internship.sector_id)\
+                              .join(Student, Match.student_id == Student.id)\
+                              .join(Internship, Match.internship_id == Internship.id)\
+                              .filter(Match.sector_score.is_(None))\
+                              .order_by(Match.id).limit(batch_size).all()
+            if not batch:
+                break
+            scores = {}
+            rows = []
+            for match_id, interests, sector in batch:
+                key = (tuple(interests or ()), sector)
+                if key not in scores:
+                    scores[key] = self.calculate_sector_interest_score(interests, sector)
+                rows.append({"id": match_id, "sector_score": scores[key]})
+            db.session.execute(update(Match), rows)
+            db.session.commit()
+            count += len(rows)
+        if count:
+            logging.info(f"Backfilled sector scores for {count} matches")
+        return count
+
+    def rerank_applications(self, weights, batch_size=1000):
+        """Recompute stored application match percentages under ``weights``, without committing"""
+        columns = [getattr(Application, COMPONENT_COLUMNS[k]) for k in COMPONENTS]
+        count = 0
+        last_id = 0
+        while True:
+            batch = db.session.query(Application.id, Application.updated_at, *columns)\
+                              .filter(Application.id > last_id, *[c.isnot(None) for c in columns])\
+                              .order_by(Application.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+            overall = rerank(np.array([row[2:] for row in batch], dtype=np.float64), weights)
+            db.session.execute(update(Application), [
+                {"id": row.id, "updated_at": row.updated_at, "match_percentage": round(score * 100, 2)}
+                for row, score in zip(batch, overall.tolist())
+            ])
+            count += len(batch)
+        return count
+
+    def rerank_matches(self, profile=None):
+        """Recompute stored overall scores from the stored components under a profile's weights.
+
+        No component is rescored: matches get a single UPDATE whose weighted
+        sum adds the components in ``COMPONENTS`` order, so the result equals
+        what a fresh scoring run with the same weights writes. Pending matches
+        that drop below the threshold are deleted; pairs that would newly cross
+        it were never stored and need a full ``generate_all_matches`` run.
+        Application match percentages are recomputed with ``rerank``, keeping
+        ``updated_at``. Defaults to the active profile.
+        """
+        if profile is None:
+            self._load_weights()
+            weights, profile_id = self.weights, self.weight_profile_id
+        else:
+            weights, profile_id = profile.weights, profile.id
+
+        try:
+            self.backfill_sector_scores()
+
+            reranked = db.session.execute(
+                update(Match)
+                .where(Match.skills_score.isnot(None))
+                .values(overall_score=weighted_sql(Match, weights), weight_profile_id=profile_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            dropped = Match.query.filter(Match.status == "pending", Match.overall_score < MATCH_THRESHOLD)\
+                                 .delete(synchronize_session=False)
+
+            applications = self.rerank_applications(weights)
+            db.session.commit()
+            stats = {"matches_reranked": reranked, "matches_dropped": dropped, "applications_reranked": applications}
+            logging.info(f"Re-ranked with weight profile {profile_id or 'default'}: {stats}")
+            return stats
+
+        except Exception as e:
+            logging.error(f"Error re-ranking matches: {e}")
+            db.session.rollback()
+            return {}
+
+
+    def normalize_reference_ids(self, batch_size=500):
+        """Re-resolve every stored location, sector and skill against the bundled data files, a batch per commit.
 
+        Run after the migrations that add the id columns and whenever a data
+        file changes. Only rows whose ids actually change are written, which
+        also bumps their ``updated_at`` so cached scores miss; skill links are
+        rewritten where the vocabulary now resolves them differently.
+        """
+        gazetteer = get_gazetteer()
+        taxonomy = get_taxonomy()
+        changed = Counter()
+        for model in (Student, Internship):
+            last_id = 0
+            while True:
+                batch = (model.query.options(selectinload(model.skills))
+                         .filter(model.id > last_id).order_by(model.id).limit(batch_size).all())
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                relinked = {}
+                for row in batch:
+                    names = parsed_skills(row)
+                    if sorted(names) != sorted(skill.name for skill in row.skills):
+                        relinked[row] = names
+                    if model is Student:
+                        resolved = {
+                            "preferred_location_ids": gazetteer.resolve(row.preferred_locations) or None,
+                            "current_location_id": gazetteer.primary(row.current_location),
+                            "sector_interest_ids": taxonomy.resolve(row.sector_interests) or None,
+                        }
+                    else:
+                        resolved = {
+                            "location_id": gazetteer.primary(row.location),
+                            "is_remote": gazetteer.is_remote(row.location),
+                            "sector_id": taxonomy.primary(row.sector),
+                        }
+                    if any(getattr(row, k) != v for k, v in resolved.items()):
+                        for k, v in resolved.items():
+                            setattr(row, k, v)
+                        changed[model.__tablename__] += 1
+                if relinked:
+                    assign_skills(db.session, relinked)
+                    changed[f"{model.__tablename__}_skills"] += len(relinked)
+                db.session.commit()
+        if changed:
+            self.refresh_catalog()
+        logging.info(f"Normalized reference ids: {dict(changed)}")
+        return changed
 
 # Create an instance of the matching engine for import
 matching_engine = InternshipMatchingEngine()
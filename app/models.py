@@ -1,8 +1,59 @@
 from app.extensions import db
+from app.feature_store import STUDENT_FIELDS
+from app.gazetteer import get_gazetteer
+from app.sectors import get_taxonomy
+from app.skills_model import MAX_SKILL_LENGTH, parse_skills, student_skills_text
 from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import validates
+from sqlalchemy.orm.attributes import flag_modified
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
+# canonical skills of each profile and posting, kept in line with the free-text columns on flush
+student_skills = db.Table(
+    'student_skills',
+    db.Column('student_id', db.Integer, db.ForeignKey('students.id'), primary_key=True),
+    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True, index=True),
+)
+
+internship_skills = db.Table(
+    'internship_skills',
+    db.Column('internship_id', db.Integer, db.ForeignKey('internships.id'), primary_key=True),
+    db.Column('skill_id', db.Integer, db.ForeignKey('skills.id'), primary_key=True, index=True),
+)
+
+
+class Skill(db.Model):
+    __tablename__ = 'skills'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(MAX_SKILL_LENGTH), unique=True, nullable=False)
+
+# profile completeness points per filled-in field, and how each field is named to the student
+PROFILE_FIELDS = {
+    'name': 10, 'email': 10, 'phone': 10, 'institution': 10, 'course': 10,
+    'year_of_study': 5, 'cgpa': 5, 'technical_skills': 10, 'soft_skills': 5,
+    'sector_interests': 10, 'current_location': 5, 'preferred_locations': 5,
+    'social_category': 3, 'district_type': 3, 'home_district': 4,
+    'previous_internships': 5, 'pm_scheme_participant': 5,
+}
+
+PROFILE_FIELD_LABELS = {
+    'name': 'Full Name', 'email': 'Email', 'phone': 'Phone Number', 'institution': 'Institution',
+    'course': 'Course/Degree', 'year_of_study': 'Year of Study', 'cgpa': 'CGPA/Percentage',
+    'technical_skills': 'Technical Skills', 'soft_skills': 'Soft Skills',
+    'sector_interests': 'Sector Interests', 'current_location': 'Current Location',
+    'preferred_locations': 'Preferred Locations', 'social_category': 'Social Category',
+    'district_type': 'District Type', 'home_district': 'Home District',
+    'previous_internships': 'Number of Previous Internships',
+    'pm_scheme_participant': 'PM Scheme Participant',
+}
+
+# student columns the scorers read; changing any of them means the student's matches are stale
+MATCH_FIELDS = tuple(f for f in STUDENT_FIELDS if f != 'id')
+
+
 class Student(db.Model):
     __tablename__ = 'students'
 
@@ -24,10 +75,13 @@ class Student(db.Model):
     technical_skills = db.Column(db.Text)
     soft_skills = db.Column(db.Text)
     sector_interests = db.Column(db.Text)
+    sector_interest_ids = db.Column(db.JSON)
 
-    # Location
+    # Location, with gazetteer place ids resolved on write
     preferred_locations = db.Column(db.Text)
     current_location = db.Column(db.String(100))
+    preferred_location_ids = db.Column(db.JSON)
+    current_location_id = db.Column(db.Integer)
 
     # Affirmative Action
     social_category = db.Column(db.String(50))
@@ -38,11 +92,38 @@ class Student(db.Model):
     previous_internships = db.Column(db.Integer, default=0)
     pm_scheme_participant = db.Column(db.Boolean, default=False)
 
+    # maintained on flush: completeness from PROFILE_FIELDS, and a version bumped
+    # with needs_rematch set whenever a MATCH_FIELDS column changes
+    profile_completeness = db.Column(db.Integer)
+    profile_version = db.Column(db.Integer, nullable=False, default=1)
+    needs_rematch = db.Column(db.Boolean, nullable=False, default=True)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     matches = db.relationship('Match', backref='student', lazy=True)
     applications = db.relationship('Application', backref='student', lazy=True)
+    skills = db.relationship('Skill', secondary=student_skills, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_students_rematch_completeness', 'needs_rematch', 'profile_completeness'),
+    )
+
+    @validates('sector_interests')
+    def _resolve_sector_interests(self, key, value):
+        self.sector_interest_ids = get_taxonomy().resolve(value) or None
+        return value
+
+    @validates('preferred_locations')
+    def _resolve_preferred_locations(self, key, value):
+        self.preferred_location_ids = get_gazetteer().resolve(value) or None
+        return value
+
+    @validates('current_location')
+    def _resolve_current_location(self, key, value):
+        self.current_location_id = get_gazetteer().primary(value)
+        return value
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -51,37 +132,22 @@ class Student(db.Model):
         return self.password_hash and check_password_hash(self.password_hash, password)
 
     def calculate_profile_completeness(self):
-        fields = {
-            'name': 10, 'email': 10, 'phone': 10, 'institution': 10, 'course': 10,
-            'year_of_study': 5, 'cgpa': 5, 'technical_skills': 10, 'soft_skills': 5,
-            'sector_interests': 10, 'current_location': 5, 'preferred_locations': 5,
-            'social_category': 3, 'district_type': 3, 'home_district': 4,
-            'previous_internships': 5, 'pm_scheme_participant': 5,
-        }
-
-        labels = {
-            'name': 'Full Name', 'email': 'Email', 'phone': 'Phone Number', 'institution': 'Institution',
-            'course': 'Course/Degree', 'year_of_study': 'Year of Study', 'cgpa': 'CGPA/Percentage',
-            'technical_skills': 'Technical Skills', 'soft_skills': 'Soft Skills',
-            'sector_interests': 'Sector Interests', 'current_location': 'Current Location',
-            'preferred_locations': 'Preferred Locations', 'social_category': 'Social Category',
-            'district_type': 'District Type', 'home_district': 'Home District',
-            'previous_internships': 'Number of Previous Internships',
-            'pm_scheme_participant': 'PM Scheme Participant',
-        }
-
         score = 0
         missing = []
 
-        for field, weight in fields.items():
+        for field, weight in PROFILE_FIELDS.items():
             value = getattr(self, field)
             if value is not None and value != "":
                 score += weight
             else:
-                missing.append(labels[field])
+                missing.append(PROFILE_FIELD_LABELS[field])
 
         return min(score, 100), missing
 
+    def missing_profile_fields(self):
+        """Labels of the profile fields still empty, for showing next to the stored completeness"""
+        return [PROFILE_FIELD_LABELS[f] for f in PROFILE_FIELDS if getattr(self, f) is None or getattr(self, f) == ""]
+
 
 class Department(db.Model):
     __tablename__ = 'departments'
@@ -137,7 +203,10 @@ class Internship(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     sector = db.Column(db.String(100))
+    sector_id = db.Column(db.Integer, index=True)
     location = db.Column(db.String(100))
+    location_id = db.Column(db.Integer, index=True)
+    is_remote = db.Column(db.Boolean, default=False)
 
     required_skills = db.Column(db.Text)
     preferred_course = db.Column(db.String(100))
@@ -157,9 +226,33 @@ class Internship(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     application_deadline = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     matches = db.relationship('Match', backref='internship', lazy=True)
     applications = db.relationship('Application', backref='internship', lazy=True)
+    skills = db.relationship('Skill', secondary=internship_skills, lazy=True)
+
+    @validates('sector')
+    def _resolve_sector(self, key, value):
+        self.sector_id = get_taxonomy().primary(value)
+        return value
+
+    @validates('location')
+    def _resolve_location(self, key, value):
+        gazetteer = get_gazetteer()
+        self.location_id = gazetteer.primary(value)
+        self.is_remote = gazetteer.is_remote(value)
+        return value
+
+    def set_filled_positions(self, filled):
+        """Change the seat count without moving ``updated_at``.
+
+        ``updated_at`` marks content edits: it keys the skills model and the
+        pair score cache, and a seat filling or freeing changes neither.
+        """
+        self.filled_positions = filled
+        # written back as-is, so the onupdate stamp doesn't fire
+        flag_modified(self, 'updated_at')
 
 
 class Match(db.Model):
@@ -174,11 +267,18 @@ class Match(db.Model):
     location_score = db.Column(db.Float)
     academic_score = db.Column(db.Float)
     affirmative_action_score = db.Column(db.Float)
+    sector_score = db.Column(db.Float)
+    engine_version = db.Column(db.Integer, index=True)
+    # profile whose weights produced overall_score; NULL is the built-in default
+    weight_profile_id = db.Column(db.Integer, db.ForeignKey('weight_profiles.id'))
 
     status = db.Column(db.String(50), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('student_id', 'internship_id'),)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'internship_id'),
+        db.Index('ix_matches_student_score', 'student_id', 'overall_score'),
+    )
 
 
 class Application(db.Model):
@@ -200,4 +300,146 @@ class Application(db.Model):
     interview_date = db.Column(db.DateTime)
     response_date = db.Column(db.DateTime)
 
+    # match score snapshot, refreshed when the student profile or internship changes
+    match_percentage = db.Column(db.Float)
+    skills_score = db.Column(db.Float)
+    location_score = db.Column(db.Float)
+    academic_score = db.Column(db.Float)
+    sector_score = db.Column(db.Float)
+    affirmative_action_score = db.Column(db.Float)
+    scored_at = db.Column(db.DateTime)
+
     __table_args__ = (db.UniqueConstraint('student_id', 'internship_id'),)
+
+
+class WeightProfile(db.Model):
+    __tablename__ = 'weight_profiles'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    weights = db.Column(db.JSON, nullable=False)
+    is_active = db.Column(db.Boolean, default=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('name', 'version'),)
+
+    @property
+    def label(self):
+        return f"{self.name}@v{self.version}"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'version': self.version,
+            'weights': self.weights,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class MatchJob(db.Model):
+    __tablename__ = 'match_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, default='generate_all_matches')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+
+    # progress; cursor is the id of the last student in the last completed chunk
+    total_students = db.Column(db.Integer, default=0)
+    processed_students = db.Column(db.Integer, default=0)
+    matches_written = db.Column(db.Integer, default=0)
+    cursor = db.Column(db.Integer, default=0)
+    chunk_size = db.Column(db.Integer)
+    # generate_all_matches only: skip students whose profile hasn't changed since they were last matched
+    changed_only = db.Column(db.Boolean, nullable=False, default=True)
+    error = db.Column(db.Text)
+    claimed_by = db.Column(db.String(120))
+    stats = db.Column(db.JSON)
+
+    created_by = db.Column(db.Integer, db.ForeignKey('admins.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def eta_seconds(self):
+        if self.status != 'running' or not self.started_at or not self.processed_students:
+            return None
+        elapsed = ((self.heartbeat_at or datetime.utcnow()) - self.started_at).total_seconds()
+        remaining = max((self.total_students or 0) - self.processed_students, 0)
+        return round(elapsed / self.processed_students * remaining)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'changed_only': self.changed_only,
+            'status': self.status,
+            'total_students': self.total_students,
+            'processed_students': self.processed_students,
+            'matches_written': self.matches_written,
+            'eta_seconds': self.eta_seconds(),
+            'stats': self.stats,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# free-text columns each model's skills are parsed from, and how
+SKILL_SOURCES = {
+    Student: (('technical_skills', 'soft_skills'), student_skills_text),
+    Internship: (('required_skills',), lambda internship: internship.required_skills),
+}
+
+
+def assign_skills(session, pending):
+    """Point each object in ``pending`` (object -> canonical names) at its ``Skill`` rows, creating missing ones"""
+    names = {name for parsed in pending.values() for name in parsed}
+    with session.no_autoflush:
+        known = {s.name: s for s in session.query(Skill).filter(Skill.name.in_(names))} if names else {}
+        for name in sorted(names - set(known)):
+            known[name] = Skill(name=name)
+            session.add(known[name])
+        for obj, parsed in pending.items():
+            obj.skills = [known[name] for name in parsed]
+
+
+def parsed_skills(obj):
+    """Canonical skill names of a student or internship, from its free-text columns"""
+    return parse_skills(SKILL_SOURCES[type(obj)][1](obj))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _sync_skills(session, flush_context, instances):
+    """Point new or edited profiles and postings at the canonical skills in their text columns"""
+    pending = {}
+    for obj in list(session.new) + list(session.dirty):
+        source = SKILL_SOURCES.get(type(obj))
+        if source is None:
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[c].history.has_changes() for c in source[0]):
+            pending[obj] = parsed_skills(obj)
+    if pending:
+        assign_skills(session, pending)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _track_profile_changes(session, flush_context, instances):
+    """Keep stored completeness current and flag students whose scored fields changed"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Student):
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[f].history.has_changes() for f in PROFILE_FIELDS):
+            obj.profile_completeness = obj.calculate_profile_completeness()[0]
+        if state.pending:
+            obj.profile_version = 1
+            obj.needs_rematch = True
+        elif any(state.attrs[f].history.has_changes() for f in MATCH_FIELDS):
+            obj.profile_version = (obj.profile_version or 0) + 1
+            obj.needs_rematch = True
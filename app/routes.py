@@ -2,8 +2,9 @@ from flask import Blueprint, render_template, session, redirect, url_for, flash,
 from werkzeug.security import check_password_hash
 import logging
 from datetime import datetime
-from .models import Student, Department, Internship, Application, Match, Admin, db
-from .matching_engine import matching_engine
+from .models import Student, Department, Internship, Application, Match, Admin, MatchJob, db
+from .matching_engine import closed_internship_clause, matching_engine
+from .jobs import ACTIVE_STATUSES, enqueue_job, ensure_worker_thread
 
 bp = Blueprint("routes", __name__, template_folder="templates")
 
@@ -93,13 +94,40 @@ def student_dashboard():
     if not student:
         return redirect(url_for('routes.index'))
     
-    # Get recent matches
-    matches = Match.query.filter_by(student_id=student.id)\
-                        .order_by(Match.overall_score.desc())\
-                        .limit(10).all()
-    
+    # Best current matches, scored live against the open catalog
+    matches = matching_engine.top_k(student, k=10)
+    internships = {i.id: i for i in Internship.query.filter(Internship.id.in_([m['internship_id'] for m in matches]))}
+    for match in matches:
+        match['internship'] = internships[match['internship_id']]
+
     return render_template('student_dashboard.html', student=student, matches=matches)
 
+@bp.route('/student/top-matches')
+def student_top_matches():
+    """JSON top-k matches for the logged-in student, with optional filters"""
+    if session.get('user_type') != 'student':
+        return jsonify({'error': 'Access denied.'}), 403
+
+    student = Student.query.get(session['user_id'])
+    if not student:
+        return jsonify({'error': 'Student not found.'}), 404
+
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+    matches = matching_engine.top_k(
+        student,
+        k=k,
+        sector=request.args.get('sector'),
+        location=request.args.get('location'),
+        min_stipend=request.args.get('min_stipend', type=float),
+    )
+    internships = {i.id: i for i in Internship.query.filter(Internship.id.in_([m['internship_id'] for m in matches]))}
+    for match in matches:
+        internship = internships[match['internship_id']]
+        match.update(title=internship.title, sector=internship.sector,
+                     location=internship.location, stipend=internship.stipend)
+
+    return jsonify({'k': k, 'matches': matches})
+
 @bp.route('/department/profile')
 def department_profile():
     """Department profile view page"""
@@ -200,6 +228,9 @@ def create_internship():
             
             db.session.add(internship)
             db.session.commit()
+            matching_engine.index_internship(internship)
+            matching_engine.refresh_catalog()
+            matching_engine.rematch_internship(internship)
             
             flash('Internship created successfully!', 'success')
             return redirect(url_for('routes.department_dashboard'))
@@ -258,6 +289,10 @@ def edit_internship(internship_id):
                 return render_template('create_internship.html', internship=internship, is_editing=True)
             
             db.session.commit()
+            matching_engine.index_internship(internship)
+            matching_engine.refresh_catalog()
+            matching_engine.rematch_internship(internship)
+            matching_engine.rescore_applications_for(internship_id=internship.id)
             flash('Internship updated successfully!', 'success')
             return redirect(url_for('view_internship', internship_id=internship.id))
             
@@ -294,6 +329,8 @@ def delete_internship(internship_id):
         # Delete the internship
         db.session.delete(internship)
         db.session.commit()
+        matching_engine.unindex_internship(internship_id)
+        matching_engine.refresh_catalog()
         
         flash('Internship deleted successfully!', 'success')
         return redirect(url_for('routes.department_dashboard'))
@@ -335,7 +372,9 @@ def view_matches():
         return redirect(url_for('routes.index'))
     
     student_id = session['user_id']
-    matches = Match.query.filter_by(student_id=student_id)\
+    # matches of closed, filled or expired internships wait for the sweeper; don't show them
+    matches = Match.query.join(Internship, Match.internship_id == Internship.id)\
+                        .filter(Match.student_id == student_id, ~closed_internship_clause(datetime.utcnow()))\
                         .order_by(Match.overall_score.desc()).all()
     
     return render_template('matches.html', matches=matches)
@@ -393,6 +432,9 @@ def apply_internship(internship_id):
             portfolio_url=portfolio_url,
             additional_notes=additional_notes
         )
+        application.student = Student.query.get(student_id)
+        application.internship = internship
+        matching_engine.score_application(application)
 
         db.session.add(application)
         db.session.commit()
@@ -495,22 +537,27 @@ def complete_student_profile():
             # Update student profile with form data
             student.name = request.form.get('name') or student.name
             student.email = request.form.get('email') or student.email
+            student.phone = request.form.get('phone') or student.phone
             student.institution = request.form.get('institution') or student.institution
             student.course = request.form.get('course') or student.course
-            student.year_of_study = request.form.get('year_of_study') or student.year_of_study
+            student.year_of_study = request.form.get('year_of_study', type=int) or student.year_of_study
             student.cgpa = request.form.get('cgpa', type=float) or student.cgpa
-            student.skills = request.form.get('skills') or student.skills
-            student.location_preference = request.form.get('location_preference') or student.location_preference
-            student.career_goals = request.form.get('career_goals') or student.career_goals
-            student.portfolio_url = request.form.get('portfolio_url') or student.portfolio_url
-            student.linkedin_url = request.form.get('linkedin_url') or student.linkedin_url
+            student.technical_skills = request.form.get('technical_skills') or student.technical_skills
+            student.soft_skills = request.form.get('soft_skills') or student.soft_skills
+            student.sector_interests = request.form.get('sector_interests') or student.sector_interests
+            student.current_location = request.form.get('current_location') or student.current_location
+            student.preferred_locations = request.form.get('preferred_locations') or student.preferred_locations
 
             # Handle category fields
-            student.category = request.form.get('category') or student.category
-            student.district = request.form.get('district') or student.district
-            student.rural_urban = request.form.get('rural_urban') or student.rural_urban
+            student.social_category = request.form.get('social_category') or student.social_category
+            student.district_type = request.form.get('district_type') or student.district_type
+            student.home_district = request.form.get('home_district') or student.home_district
+            student.previous_internships = request.form.get('previous_internships', type=int, default=student.previous_internships)
+            student.pm_scheme_participant = 'pm_scheme_participant' in request.form
 
             db.session.commit()
+            matching_engine.rematch_student(student)
+            matching_engine.rescore_applications_for(student_id=student.id)
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('routes.student_dashboard'))
 
@@ -535,17 +582,16 @@ def department_applications():
                                   .filter(Internship.company_id == dept_id)\
                                   .order_by(Application.applied_at.desc()).all()
     
-    # Calculate match percentages for each application
-    applications_with_match = []
-    for application in applications:
-        match_percentage = matching_engine.calculate_match_percentage(
-            application.student, 
-            application.internship
-        )
-        applications_with_match.append({
-            'application': application,
-            'match_percentage': match_percentage
-        })
+    # Score any applications made before scores were stored
+    unscored = [a for a in applications if a.match_percentage is None]
+    if unscored:
+        matching_engine.rescore_applications(unscored)
+        db.session.commit()
+
+    applications_with_match = [
+        {'application': application, 'match_percentage': application.match_percentage}
+        for application in applications
+    ]
     
     return render_template('department_applications.html', 
                          applications_with_match=applications_with_match)
@@ -566,22 +612,68 @@ def internship_applications(internship_id):
     applications = Application.query.filter_by(internship_id=internship_id)\
                                   .order_by(Application.applied_at.desc()).all()
     
-    # Calculate match percentages for each application
-    applications_with_match = []
-    for application in applications:
-        match_percentage = matching_engine.calculate_match_percentage(
-            application.student, 
-            internship
-        )
-        applications_with_match.append({
-            'application': application,
-            'match_percentage': match_percentage
-        })
+    # Score any applications made before scores were stored
+    unscored = [a for a in applications if a.match_percentage is None]
+    if unscored:
+        matching_engine.rescore_applications(unscored)
+        db.session.commit()
+
+    applications_with_match = [
+        {'application': application, 'match_percentage': application.match_percentage}
+        for application in applications
+    ]
     
     return render_template('internship_applications.html', 
                          internship=internship, 
                          applications_with_match=applications_with_match)
 
+@bp.route('/internship/<int:internship_id>/candidates')
+def internship_candidates(internship_id):
+    """Rank all students against an internship, including ones who have not applied"""
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if session.get('user_type') != 'department':
+        if is_ajax:
+            return jsonify({'error': 'Access denied.'}), 403
+        return redirect(url_for('routes.index'))
+
+    internship = Internship.query.get_or_404(internship_id)
+    if internship.company_id != session['user_id']:
+        if is_ajax:
+            return jsonify({'error': 'Access denied.'}), 403
+        flash('Access denied.', 'error')
+        return redirect(url_for('routes.department_dashboard'))
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+    social_category = request.args.get('social_category') or None
+    district_type = request.args.get('district_type') or None
+
+    total, candidates = matching_engine.rank_students(
+        internship, page=page, per_page=per_page,
+        social_category=social_category, district_type=district_type,
+    )
+    if is_ajax:
+        return jsonify({'total': total, 'page': page, 'per_page': per_page, 'candidates': candidates})
+
+    ids = [c['student_id'] for c in candidates]
+    students = {s.id: s for s in Student.query.filter(Student.id.in_(ids))}
+    applied = {a.student_id for a in Application.query.filter(
+        Application.internship_id == internship_id, Application.student_id.in_(ids))}
+    for candidate in candidates:
+        candidate['student'] = students[candidate['student_id']]
+        candidate['applied'] = candidate['student_id'] in applied
+        candidate['match_percentage'] = round(candidate['overall_score'] * 100, 2)
+
+    return render_template('internship_candidates.html',
+                           internship=internship,
+                           candidates=candidates,
+                           total=total,
+                           page=page,
+                           per_page=per_page,
+                           pages=(total + per_page - 1) // per_page,
+                           social_category=social_category,
+                           district_type=district_type)
+
 @bp.route('/department/student/<int:student_id>')
 def view_student_profile(student_id):
     """View a student's profile for application review"""
@@ -601,8 +693,11 @@ def view_student_profile(student_id):
         flash('Access denied. You can only view profiles of students who applied to your internships.', 'error')
         return redirect(url_for('routes.department_dashboard'))
     
-    # Calculate profile completeness
-    completeness_score, missing_fields = student.calculate_profile_completeness()
+    # completeness is stored on write; only students not yet backfilled need it computed
+    if student.profile_completeness is None:
+        completeness_score, missing_fields = student.calculate_profile_completeness()
+    else:
+        completeness_score, missing_fields = student.profile_completeness, student.missing_profile_fields()
     
     return render_template('student_profile_view.html', 
                          student=student,
@@ -638,14 +733,14 @@ def update_application_status(application_id):
             if old_status == 'accepted' and new_status != 'accepted':
                 # Moving away from accepted - decrement filled positions
                 if internship.filled_positions and internship.filled_positions > 0:
-                    internship.filled_positions -= 1
+                    internship.set_filled_positions(internship.filled_positions - 1)
             elif old_status != 'accepted' and new_status == 'accepted':
                 # Moving to accepted - increment filled positions (check capacity)
                 current_filled = internship.filled_positions or 0
                 if current_filled >= internship.total_positions:
                     flash(f'Cannot accept more students. All {internship.total_positions} positions are filled.', 'error')
                     return redirect(url_for('routes.internship_applications', internship_id=internship.id))
-                internship.filled_positions = current_filled + 1
+                internship.set_filled_positions(current_filled + 1)
             
             # Update application details
             application.status = new_status
@@ -653,6 +748,14 @@ def update_application_status(application_id):
             application.response_date = datetime.utcnow()
             
             db.session.commit()
+            if old_status != new_status and 'accepted' in (old_status, new_status):
+                # scores don't depend on seat counts, only on whether a seat is left:
+                # the last position filling retires the matches, freeing one brings them back
+                open_seats = (internship.total_positions or 0) - (internship.filled_positions or 0)
+                if new_status == 'accepted' and open_seats <= 0:
+                    matching_engine.retire_internship_matches(internship.id)
+                elif old_status == 'accepted' and open_seats == 1:
+                    matching_engine.rematch_internship(internship)
             
             status_msg = {
                 'pending': 'moved to pending',
@@ -693,6 +796,9 @@ def admin_dashboard():
     
     # Get recent departments
     recent_departments = Department.query.order_by(Department.created_at.desc()).limit(5).all()
+
+    latest_match_job = MatchJob.query.filter_by(kind='generate_all_matches')\
+                                     .order_by(MatchJob.id.desc()).first()
     
     return render_template('admin_dashboard.html', 
                          admin=admin,
@@ -700,7 +806,8 @@ def admin_dashboard():
                          total_departments=total_departments,
                          total_internships=total_internships,
                          total_applications=total_applications,
-                         recent_departments=recent_departments)
+                         recent_departments=recent_departments,
+                         latest_match_job=latest_match_job)
 
 @bp.route('/admin/departments', methods=['GET', 'POST'])
 def manage_departments():
@@ -805,28 +912,91 @@ def delete_department(dept_id):
     
     return redirect(url_for('routes.manage_departments'))
 
-@bp.route('/generate-all-matches')
+@bp.route('/generate-all-matches', methods=['GET', 'POST'])
 def generate_all_matches():
-    """Admin function to generate matches for all students"""
+    """Admin function to queue match generation for all students"""
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
     if session.get('user_type') != 'admin':
+        if is_ajax:
+            return jsonify({'error': 'Access denied.'}), 403
         flash('Access denied.', 'danger')
         return redirect(url_for('routes.index'))
         
     try:
-        total_matches = matching_engine.generate_all_matches()
-        flash(f'Generated {total_matches} total matches!', 'success')
+        # a full run also covers internships added outside the app (imports, seed scripts)
+        changed_only = not request.form.get('full')
+        job = enqueue_job('generate_all_matches', created_by=session['user_id'],
+                          total=matching_engine.rematch_query(changed_only).count(), changed_only=changed_only)
+        ensure_worker_thread(current_app._get_current_object())
+        if is_ajax:
+            return jsonify(job.to_dict()), 202
+        flash(f'Match generation queued (job #{job.id}). Progress is shown on the dashboard.', 'info')
         
     except Exception as e:
-        logging.error(f"Error generating all matches: {e}")
+        logging.error(f"Error queueing match generation: {e}")
+        db.session.rollback()
+        if is_ajax:
+            return jsonify({'error': 'Failed to queue match generation.'}), 500
         flash('Failed to generate matches. Please try again.', 'error')
     
     return redirect(url_for('routes.admin_dashboard'))
 
+@bp.route('/admin/sweep-matches', methods=['POST'])
+def sweep_matches():
+    """Admin function to queue a sweep of stale matches"""
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if session.get('user_type') != 'admin':
+        if is_ajax:
+            return jsonify({'error': 'Access denied.'}), 403
+        flash('Access denied.', 'danger')
+        return redirect(url_for('routes.index'))
+
+    try:
+        job = enqueue_job('sweep_matches', created_by=session['user_id'],
+                          total=matching_engine.count_stale_matches())
+        ensure_worker_thread(current_app._get_current_object())
+        if is_ajax:
+            return jsonify(job.to_dict()), 202
+        flash(f'Stale match sweep queued (job #{job.id}).', 'info')
+
+    except Exception as e:
+        logging.error(f"Error queueing match sweep: {e}")
+        db.session.rollback()
+        if is_ajax:
+            return jsonify({'error': 'Failed to queue match sweep.'}), 500
+        flash('Failed to queue match sweep. Please try again.', 'error')
+
+    return redirect(url_for('routes.admin_dashboard'))
+
+@bp.route('/admin/match-jobs/<int:job_id>')
+def match_job_status(job_id):
+    """JSON progress of a background match job"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'error': 'Access denied.'}), 403
+
+    job = MatchJob.query.get_or_404(job_id)
+    if job.status in ACTIVE_STATUSES:
+        # picks the job back up if the worker that owned it was restarted
+        ensure_worker_thread(current_app._get_current_object())
+    return jsonify(job.to_dict())
+
+@bp.route('/admin/match-stats')
+def match_stats():
+    """JSON counters for the matching engine's pruning and pairwise score cache"""
+    if session.get('user_type') != 'admin':
+        return jsonify({'error': 'Access denied.'}), 403
+
+    return jsonify({
+        'pruning': matching_engine.pruning_summary(),
+        'score_cache': matching_engine.score_cache.summary(),
+    })
+
 @bp.route('/internship/<int:internship_id>')
 def view_internship(internship_id):
     """View internship details"""
     internship = Internship.query.get_or_404(internship_id)
-    return render_template('internship_details.html', internship=internship)
+    similar = matching_engine.similar_internships(internship.id)
+    return render_template('internship_details.html', internship=internship, similar=similar)
 
 
 @bp.route("/health")
@@ -0,0 +1,79 @@
+import sys
+import threading
+from collections import Counter, OrderedDict
+
+
+def _entry_size(key, value):
+    """Approximate bytes held by one cache entry"""
+    size = sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+    size += sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return size
+
+
+class PairScoreCache:
+    """Bounded LRU cache of per-pair component scores.
+
+    Keys carry the student and internship ``updated_at`` stamps and the skills
+    model version, so an edited profile or posting, or a refitted model, simply
+    misses and the stale entry ages out. Least recently used entries are evicted
+    once the estimated size passes ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    @staticmethod
+    def key(student, internship, model_version):
+        return (student.id, student.updated_at, internship.id, internship.updated_at, model_version)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return dict(value)
+
+    def put(self, key, value):
+        size = _entry_size(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and self._entries:
+                old, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(old)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def summary(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.stats["hits"],
+                "misses": self.stats["misses"],
+                "evictions": self.stats["evictions"],
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,158 @@
+"""Database-free scoring of students against the internship catalog.
+
+Everything here works on a fitted ``SkillsModel``, an ``InternshipFeatureStore``
+and plain student records, so it can run inside worker processes that have no
+app context or database connection.
+"""
+import multiprocessing
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.skills_model import student_skills_text
+
+# stamped on every Match row; bump whenever a scorer changes so the sweeper rescores old rows.
+# Weight changes don't need a bump: they go through a weight profile and a re-rank.
+ENGINE_VERSION = 5
+# component order; weighted sums always add in this order so every path gives identical floats
+COMPONENTS = ("skills", "academic", "location", "sector", "affirmative")
+# the built-in "default" weight profile, used until another profile is activated
+WEIGHTS = {"skills": 0.35, "academic": 0.25, "location": 0.20, "sector": 0.15, "affirmative": 0.05}
+MATCH_THRESHOLD = 0.3
+# slack so float rounding in the bound never prunes a pair sitting exactly on the threshold
+BOUND_EPSILON = 1e-9
+
+ChunkResult = namedtuple(
+    "ChunkResult",
+    "student_ids internship_ids overall skills location academic affirmative sector stats",
+)
+
+
+def partial_scores(scores, weights=WEIGHTS):
+    """Weighted sum of every component except skills"""
+    partial = np.zeros_like(scores["location"])
+    for k in COMPONENTS:
+        if k != "skills":
+            partial += scores[k] * weights[k]
+    return partial
+
+
+def weighted_total(scores, weights=WEIGHTS):
+    total = np.zeros_like(scores["location"])
+    for k in COMPONENTS:
+        total += scores[k] * weights[k]
+    return total
+
+
+def rerank(components, weights):
+    """Overall scores for stored components under new weights.
+
+    ``components`` is an (n x 5) array with columns in ``COMPONENTS`` order.
+    Summed column by column rather than with ``@``, so the result matches
+    ``weighted_total`` bit for bit.
+    """
+    total = np.zeros(len(components), dtype=np.float64)
+    for j, k in enumerate(COMPONENTS):
+        total += components[:, j] * weights[k]
+    return total
+
+
+def score_block(model, store, students, columns, weights=WEIGHTS):
+    """Score ``students`` against the store columns ``columns`` as dense matrices.
+
+    Skills similarity is skipped for pairs that cannot reach the threshold;
+    those keep a skills score of 0. Returns the component matrices, the overall
+    score, the pass mask and per-stage pruning counts.
+    """
+    texts = [student_skills_text(s) for s in students]
+    shape = (len(students), len(columns))
+
+    scores = {k: np.empty(shape, dtype=np.float64) for k in COMPONENTS}
+    for r, student in enumerate(students):
+        for k, row in store.component_scores(student).items():
+            scores[k][r] = row[columns]
+
+    reachable = partial_scores(scores, weights) + weights["skills"] + BOUND_EPSILON >= MATCH_THRESHOLD
+    needed = np.flatnonzero(reachable.any(axis=0))
+    scores["skills"][:] = 0.0
+    if len(needed):
+        sims = model.similarity_matrix(texts, rows=columns[needed])
+        scores["skills"][:, needed] = np.where(reachable[:, needed], sims, 0.0)
+
+    overall = weighted_total(scores, weights)
+
+    passed = reachable & (overall >= MATCH_THRESHOLD)
+    stats = Counter(
+        pairs_considered=reachable.size,
+        pruned_upper_bound=int((~reachable).sum()),
+        skills_scored=int(reachable.sum()),
+        below_threshold=int((reachable & ~passed).sum()),
+        passed_threshold=int(passed.sum()),
+    )
+    return scores, overall, passed, stats
+
+
+def score_chunk(model, store, columns, students, weights=WEIGHTS):
+    """Score a chunk of students and keep only the pairs above the threshold"""
+    scores, overall, passed, stats = score_block(model, store, students, columns, weights)
+    r, c = np.nonzero(passed)
+    student_ids = np.array([s.id for s in students], dtype=np.int64)
+    return ChunkResult(
+        student_ids=student_ids[r],
+        internship_ids=store.internship_ids[columns][c],
+        overall=overall[r, c],
+        stats=stats,
+        **{k: scores[k][r, c] for k in COMPONENTS},
+    )
+
+
+def keep_best(result, keep):
+    """Restrict a ChunkResult to the ``keep`` highest-scoring pairs of each student"""
+    if not keep or not len(result.student_ids):
+        return result
+    order = np.lexsort((result.internship_ids, -result.overall, result.student_ids))
+    sids = result.student_ids[order]
+    starts = np.flatnonzero(np.r_[True, sids[1:] != sids[:-1]])
+    rank = np.arange(len(sids)) - np.repeat(starts, np.diff(np.r_[starts, len(sids)]))
+    chosen = np.sort(order[rank < keep])
+    return result._replace(**{f: getattr(result, f)[chosen] for f in result._fields if f != "stats"})
+
+
+_worker_catalog = None
+
+
+def _init_worker(model, store, columns, weights):
+    # runs once per worker; with the fork start method nothing is pickled at all
+    global _worker_catalog
+    _worker_catalog = (model, store, columns, weights)
+
+
+def _score_chunk_in_worker(students):
+    model, store, columns, weights = _worker_catalog
+    return score_chunk(model, store, columns, students, weights)
+
+
+def score_chunks_parallel(model, store, columns, chunks, workers, weights=WEIGHTS):
+    """Score chunks across a process pool, yielding results in input order.
+
+    The catalog is handed to each worker once at start-up rather than with
+    every task, and at most ``2 * workers`` chunks are in flight at a time.
+    """
+    context = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model, store, columns, weights),
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_score_chunk_in_worker, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,113 @@
+import csv
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from app.gazetteer import NameIndex
+
+SECTORS_PATH = os.path.join(os.path.dirname(__file__), "data", "sectors.csv")
+# similarity between an interest and a sector by how they sit in the taxonomy
+SAME_SECTOR = 1.0
+ANCESTOR_SECTOR = 0.8
+SIBLING_SECTOR = 0.6
+UNRELATED_SECTOR = 0.3
+# score when the student has no recognised interest or the internship no recognised sector
+UNKNOWN_SECTOR = 0.5
+
+Sector = namedtuple("Sector", "id name parent aliases")
+
+
+class SectorTaxonomy:
+    """Sectors arranged in a tree, compiled into a dense sector x sector similarity matrix.
+
+    A sector is identical to itself, related to its ancestors and descendants
+    (Fintech and Finance) and loosely related to anything sharing an ancestor
+    (Fintech and Banking); everything else is unrelated. ``similarity`` is
+    indexed by position and has an extra all-zero row and column at position
+    ``len(self)`` for padding.
+    """
+
+    def __init__(self, sectors):
+        self.sectors = list(sectors)
+        self.ids = np.array([s.id for s in self.sectors], dtype=np.int64)
+        self.pos_of = {s.id: n for n, s in enumerate(self.sectors)}
+        self.names = NameIndex((name, s.id) for s in self.sectors for name in (s.name, *s.aliases))
+
+        parent_of = {s.id: s.parent for s in self.sectors}
+        lineage = []
+        for sector in self.sectors:
+            chain = [sector.id]
+            while parent_of.get(chain[-1]) is not None and len(chain) <= len(self.sectors):
+                chain.append(parent_of[chain[-1]])
+            lineage.append(chain)
+
+        n = len(self.sectors)
+        self.similarity = np.zeros((n + 1, n + 1), dtype=np.float64)
+        self.similarity[:n, :n] = UNRELATED_SECTOR
+        for a, chain_a in enumerate(lineage):
+            for b, chain_b in enumerate(lineage):
+                if a == b:
+                    self.similarity[a, b] = SAME_SECTOR
+                elif self.sectors[a].id in chain_b or self.sectors[b].id in chain_a:
+                    self.similarity[a, b] = ANCESTOR_SECTOR
+                elif set(chain_a) & set(chain_b):
+                    self.similarity[a, b] = SIBLING_SECTOR
+
+    @classmethod
+    def from_csv(cls, path=SECTORS_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        id_of = {row["name"]: int(row["id"]) for row in rows}
+        return cls(
+            Sector(
+                id=int(row["id"]),
+                name=row["name"],
+                parent=id_of[row["parent"]] if row["parent"] else None,
+                aliases=tuple(a for a in (row["aliases"] or "").split("|") if a),
+            )
+            for row in rows
+        )
+
+    def __len__(self):
+        return len(self.sectors)
+
+    @property
+    def unknown(self):
+        """Position of the all-zero padding row and column of ``similarity``"""
+        return len(self.sectors)
+
+    def resolve(self, text):
+        """Sector ids mentioned in ``text``, in order of appearance"""
+        return self.names.resolve(text)
+
+    def primary(self, text):
+        ids = self.resolve(text)
+        return ids[0] if ids else None
+
+    def position(self, sector_id):
+        return self.pos_of.get(sector_id, self.unknown)
+
+    def positions(self, sector_ids):
+        return np.array([self.position(s) for s in sector_ids or ()], dtype=np.int64)
+
+    def known(self, sector_ids):
+        """The ids in ``sector_ids`` that are in the taxonomy"""
+        return [s for s in sector_ids or () if s in self.pos_of]
+
+
+@lru_cache(maxsize=1)
+def get_taxonomy():
+    """The bundled sector taxonomy, loaded once per process"""
+    return SectorTaxonomy.from_csv()
+
+
+def sector_score(interest_ids, sector_id):
+    """Scalar sector score for one pair: the best similarity between any interest and the sector"""
+    t = get_taxonomy()
+    interests = t.known(interest_ids)
+    column = t.position(sector_id)
+    if not interests or column == t.unknown:
+        return UNKNOWN_SECTOR
+    return float(max(t.similarity[t.position(i), column] for i in interests))
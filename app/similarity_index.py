@@ -0,0 +1,181 @@
+import logging
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+from app.feature_store import _factorize
+from app.skills_model import SkillsModel
+
+# share of the item-to-item similarity coming from each attribute
+SIMILARITY_WEIGHTS = {"skills": 0.6, "sector": 0.25, "location": 0.15}
+DEFAULT_NEIGHBOURS = 10
+# rows scored per dense block during a full build
+BUILD_BLOCK_ROWS = 512
+# refit the vocabulary once this share of the catalog has changed incrementally
+REFIT_FRACTION = 0.2
+
+
+class SimilarInternshipsIndex:
+    """Top-N most similar internships for every active internship.
+
+    Similarity is a weighted sum of TF-IDF cosine over required skills and
+    exact (case-insensitive) sector and location matches. The vocabulary is
+    fitted at full build time; postings added or edited afterwards are
+    transformed into it and only their own row, plus any neighbour list they
+    enter or leave, is recomputed.
+    """
+
+    def __init__(self, neighbours=DEFAULT_NEIGHBOURS):
+        self.neighbours = neighbours
+        self.model = SkillsModel()
+        self.ids = []
+        self.pos_of = {}
+        self.vectors = None
+        self.sector_of = {}
+        self.location_of = {}
+        self.similar = {}
+        self.changes = 0
+
+    @classmethod
+    def from_internships(cls, internships, neighbours=DEFAULT_NEIGHBOURS):
+        index = cls(neighbours)
+        index.build(internships)
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, internships):
+        self.model = SkillsModel.from_internships(internships)
+        self.ids = [i.id for i in internships]
+        self.pos_of = {iid: n for n, iid in enumerate(self.ids)}
+        self.vectors = self.model.matrix
+        self.sector_of = {i.id: (i.sector or "").strip().lower() for i in internships}
+        self.location_of = {i.id: (i.location or "").strip().lower() for i in internships}
+        self.similar = {}
+        self.changes = 0
+
+        sector_ids, _ = _factorize([self.sector_of[i] for i in self.ids])
+        location_ids, _ = _factorize([self.location_of[i] for i in self.ids])
+        ids = np.asarray(self.ids, dtype=np.int64)
+
+        for start in range(0, len(ids), BUILD_BLOCK_ROWS):
+            block = slice(start, min(start + BUILD_BLOCK_ROWS, len(ids)))
+            sims = self._scores(
+                None if self.vectors is None else self.vectors[block],
+                sector_ids[block], location_ids[block], sector_ids, location_ids,
+            )
+            for r, iid in enumerate(ids[block].tolist()):
+                sims[r, start + r] = -1.0
+                self.similar[iid] = self._top(ids, sims[r])
+
+        logging.info(f"Built similar-internships index over {len(ids)} internships")
+        return self
+
+    def _scores(self, vectors, sectors, locations, all_sectors, all_locations):
+        """Dense (rows x catalog) similarity block"""
+        w = SIMILARITY_WEIGHTS
+        sims = np.zeros((len(sectors), len(all_sectors)), dtype=np.float64)
+        if vectors is not None and self.vectors is not None:
+            sims += w["skills"] * np.minimum((vectors @ self.vectors.T).toarray(), 1.0)
+        sims += w["sector"] * ((sectors[:, None] == all_sectors[None, :]) & (sectors[:, None] >= 0))
+        sims += w["location"] * ((locations[:, None] == all_locations[None, :]) & (locations[:, None] >= 0))
+        return sims
+
+    def _top(self, ids, scores):
+        n = min(self.neighbours, int((scores > 0).sum()))
+        if not n:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return [(int(ids[c]), float(scores[c])) for c in top]
+
+    def _row(self, internship_id):
+        """Similarity of one indexed internship against the whole catalog, self excluded"""
+        ids = np.asarray(self.ids, dtype=np.int64)
+        sectors = np.array([self.sector_of[i] for i in self.ids])
+        locations = np.array([self.location_of[i] for i in self.ids])
+        pos = self.pos_of[internship_id]
+
+        w = SIMILARITY_WEIGHTS
+        scores = np.zeros(len(ids), dtype=np.float64)
+        if self.vectors is not None:
+            scores += w["skills"] * np.minimum((self.vectors @ self.vectors[pos].T).toarray().ravel(), 1.0)
+        if sectors[pos]:
+            scores += w["sector"] * (sectors == sectors[pos])
+        if locations[pos]:
+            scores += w["location"] * (locations == locations[pos])
+        scores[pos] = -1.0
+        return ids, scores
+
+    def needs_refit(self):
+        return self.changes > max(REFIT_FRACTION * len(self.ids), 1)
+
+    def upsert(self, internship):
+        """Add or re-index one posting, updating every neighbour list it affects"""
+        iid = internship.id
+        if self.vectors is not None:
+            vector = self.model.transform(internship.required_skills)
+            if vector is None:
+                vector = csr_matrix((1, self.vectors.shape[1]))
+            if iid in self.pos_of:
+                pos = self.pos_of[iid]
+                self.vectors = vstack([self.vectors[:pos], vector, self.vectors[pos + 1:]]).tocsr()
+            else:
+                self.vectors = vstack([self.vectors, vector]).tocsr()
+        if iid not in self.pos_of:
+            self.pos_of[iid] = len(self.ids)
+            self.ids.append(iid)
+        self.sector_of[iid] = (internship.sector or "").strip().lower()
+        self.location_of[iid] = (internship.location or "").strip().lower()
+        self.changes += 1
+
+        ids, scores = self._row(iid)
+        self.similar[iid] = self._top(ids, scores)
+        self._refresh_neighbours(iid, dict(zip(ids.tolist(), scores.tolist())))
+
+    def remove(self, internship_id):
+        if internship_id not in self.pos_of:
+            return
+        pos = self.pos_of.pop(internship_id)
+        self.ids.pop(pos)
+        self.pos_of = {iid: n for n, iid in enumerate(self.ids)}
+        if self.vectors is not None:
+            keep = np.ones(self.vectors.shape[0], dtype=bool)
+            keep[pos] = False
+            self.vectors = self.vectors[keep]
+        self.sector_of.pop(internship_id, None)
+        self.location_of.pop(internship_id, None)
+        self.similar.pop(internship_id, None)
+        self.changes += 1
+        self._refresh_neighbours(internship_id, {})
+
+    def _refresh_neighbours(self, changed_id, score_with):
+        """Fix up the lists of other postings after ``changed_id`` moved, appeared or vanished.
+
+        Lists are patched in place; a list is only recomputed when ``changed_id``
+        falls out of a full list, since an unlisted posting may then move up.
+        """
+        for other, neighbours in self.similar.items():
+            if other == changed_id:
+                continue
+            score = score_with.get(other, 0.0)
+            rest = [(nid, s) for nid, s in neighbours if nid != changed_id]
+            listed = len(rest) != len(neighbours)
+            full = len(neighbours) >= self.neighbours
+            floor = neighbours[-1][1] if full else 0.0
+
+            if listed and full and score < floor:
+                ids, scores = self._row(other)
+                self.similar[other] = self._top(ids, scores)
+            elif score > 0 and (listed or score > floor):
+                rest.append((changed_id, score))
+                rest.sort(key=lambda item: (-item[1], item[0]))
+                self.similar[other] = rest[:self.neighbours]
+            elif listed:
+                self.similar[other] = rest
+
+    def neighbours_of(self, internship_id, n=None):
+        """[(internship_id, score), ...] best first"""
+        neighbours = self.similar.get(internship_id, [])
+        return neighbours if n is None else neighbours[:n]
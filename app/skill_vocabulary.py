@@ -0,0 +1,107 @@
+import csv
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+SKILLS_PATH = os.path.join(os.path.dirname(__file__), "data", "skills.csv")
+# character n-gram length of the fuzzy index
+NGRAM = 3
+# Dice similarity of n-gram sets a fuzzy match must reach
+FUZZY_THRESHOLD = 0.75
+# shorter names are matched exactly or not at all; "r" and "c" are too close to everything
+FUZZY_MIN_LENGTH = 4
+# distinct phrases whose resolution is remembered per process
+RESOLVE_CACHE_SIZE = 65536
+
+
+def _key(name):
+    """``name`` with everything but letters, digits, + and # dropped, for spelling-insensitive lookup"""
+    return re.sub(r"[^a-z0-9+#]+", "", name.lower())
+
+
+def _unversioned(key):
+    # "tensorflow2", "python3.10", "html5"
+    return re.sub(r"[0-9.]+$", "", key)
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class SkillVocabulary:
+    """Known skills with their synonyms and a character n-gram index over both.
+
+    ``resolve`` maps a cleaned skill name to its canonical name: synonyms
+    first ("ml" is "machine learning"), then the same spelling without
+    punctuation, spaces or a trailing version number ("Node JS",
+    "TensorFlow2"), then the closest known name by n-gram overlap
+    ("postgre" is "postgresql"). Anything else is its own canonical name, so
+    unknown skills still match each other exactly.
+    """
+
+    def __init__(self, entries):
+        self.canonical = {}
+        for name, aliases in entries:
+            for alias in (name, *aliases):
+                self.canonical.setdefault(" ".join(alias.lower().split()), name)
+        self.by_key = {}
+        for alias, name in self.canonical.items():
+            self.by_key.setdefault(_key(alias), name)
+
+        self.grams_of = {alias: ngrams(_key(alias)) for alias in self.canonical}
+        self.postings = defaultdict(set)
+        for alias, grams in self.grams_of.items():
+            for gram in grams:
+                self.postings[gram].add(alias)
+
+    @classmethod
+    def from_csv(cls, path=SKILLS_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(
+                (row["name"], tuple(a for a in (row["aliases"] or "").split("|") if a))
+                for row in csv.DictReader(f)
+            )
+
+    def __len__(self):
+        return len(set(self.canonical.values()))
+
+    def resolve(self, name):
+        """Canonical name of a lowercased, whitespace-collapsed skill name"""
+        found = self.canonical.get(name)
+        if found is not None:
+            return found
+        key = _key(name)
+        for candidate in (key, _unversioned(key)):
+            if candidate in self.by_key:
+                return self.by_key[candidate]
+        if len(key) < FUZZY_MIN_LENGTH:
+            return name
+        return self._closest(key) or name
+
+    def _closest(self, key):
+        grams = ngrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for alias in self.postings.get(gram, ()):
+                shared[alias] += 1
+        best, best_score = None, FUZZY_THRESHOLD
+        # sorted so ties always go the same way
+        for alias in sorted(shared):
+            score = 2 * shared[alias] / (len(grams) + len(self.grams_of[alias]))
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = alias, score
+        return self.canonical[best] if best is not None else None
+
+
+@lru_cache(maxsize=1)
+def get_vocabulary():
+    """The bundled skill vocabulary, loaded once per process"""
+    return SkillVocabulary.from_csv()
+
+
+@lru_cache(maxsize=RESOLVE_CACHE_SIZE)
+def canonical_skill(name):
+    """Memoised ``get_vocabulary().resolve``; each distinct phrase is only searched once"""
+    return get_vocabulary().resolve(name)
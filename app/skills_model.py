@@ -0,0 +1,148 @@
+import logging
+import re
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from app.skill_vocabulary import canonical_skill
+
+
+# longest canonical skill name kept; matches the skills.name column
+MAX_SKILL_LENGTH = 100
+
+
+def parse_skills(skills_text):
+    """Canonical skill names in a comma-separated list, resolved through the skill vocabulary, no repeats"""
+    names = []
+    for part in re.split(r"[,;\n]", skills_text or ""):
+        name = " ".join(part.lower().split())
+        if not name or len(name) > MAX_SKILL_LENGTH:
+            continue
+        name = canonical_skill(name)
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def _skill_terms(names):
+    # documents are already-parsed canonical skill lists; module level so the model pickles
+    return names
+
+
+def _make_vectorizer():
+    # each canonical skill is one term, so two lists have a non-zero similarity
+    # exactly when they share a skill, which is what the skill tables index
+    return TfidfVectorizer(analyzer=_skill_terms)
+
+
+def preprocess_skills(skills_text):
+    """Normalize comma-separated skills"""
+    return ", ".join(parse_skills(skills_text))
+
+
+def student_skills_text(student):
+    """A student's technical and soft skills as one comma-separated list"""
+    return ", ".join(s for s in (student.technical_skills, student.soft_skills) if s)
+
+
+class SkillsModel:
+    """TF-IDF model fitted once over the required skills of all active internships.
+
+    Rows of ``matrix`` are L2-normalised, so the cosine similarity of a student
+    against every internship is a single sparse matrix-vector product.
+    """
+
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = None
+        self.internship_ids = np.empty(0, dtype=np.int64)
+        self.row_of = {}
+
+    @classmethod
+    def from_internships(cls, internships):
+        model = cls()
+        model.fit(internships)
+        return model
+
+    def fit(self, internships):
+        ids = [i.id for i in internships]
+        docs = [parse_skills(i.required_skills) for i in internships]
+
+        self.internship_ids = np.asarray(ids, dtype=np.int64)
+        self.row_of = {iid: row for row, iid in enumerate(ids)}
+
+        vectorizer = _make_vectorizer()
+        try:
+            self.matrix = vectorizer.fit_transform(docs).tocsr()
+            self.vectorizer = vectorizer
+        except ValueError:
+            # no internship lists a skill
+            logging.info("Skills model has an empty vocabulary")
+            self.matrix = None
+            self.vectorizer = None
+
+        logging.info(f"Fitted skills model over {len(ids)} internships")
+        return self
+
+    def restrict(self, internship_ids):
+        """View of the model over a subset of its internships, sharing the fitted vocabulary"""
+        sub = SkillsModel()
+        sub.vectorizer = self.vectorizer
+        sub.internship_ids = np.asarray(internship_ids, dtype=np.int64)
+        sub.row_of = {iid: row for row, iid in enumerate(internship_ids)}
+        if self.matrix is not None:
+            sub.matrix = self.matrix[[self.row_of[i] for i in internship_ids]]
+        return sub
+
+    @property
+    def is_empty(self):
+        return self.vectorizer is None
+
+    def transform(self, skills_text):
+        """TF-IDF row vector for a free-text skills list, or None"""
+        if self.is_empty or not skills_text:
+            return None
+        return self.transform_parsed(parse_skills(skills_text))
+
+    def transform_parsed(self, names):
+        """TF-IDF row vector for a list of canonical skill names, or None"""
+        if self.is_empty or not names:
+            return None
+        return self.vectorizer.transform([names])
+
+    def similarities(self, skills_text, rows=None):
+        """Cosine similarity of ``skills_text`` against every fitted internship.
+
+        When ``rows`` is given only those rows are computed; the rest stay 0.
+        """
+        scores = np.zeros(len(self.internship_ids), dtype=np.float64)
+        vec = self.transform(skills_text)
+        if vec is None or not vec.nnz:
+            return scores
+        if rows is None:
+            scores[:] = (self.matrix @ vec.T).toarray().ravel()
+        elif len(rows):
+            scores[rows] = (self.matrix[rows] @ vec.T).toarray().ravel()
+        return np.minimum(scores, 1.0)
+
+    def similarity_matrix(self, skills_texts, rows=None):
+        """Dense (texts x internships) cosine similarities for a batch of students.
+
+        When ``rows`` is given the result only has those internship columns.
+        """
+        width = len(self.internship_ids) if rows is None else len(rows)
+        out = np.zeros((len(skills_texts), width), dtype=np.float64)
+        if self.is_empty or not skills_texts or not width:
+            return out
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        vecs = self.vectorizer.transform([parse_skills(t) for t in skills_texts])
+        out[:] = (vecs @ matrix.T).toarray()
+        return np.minimum(out, 1.0)
+
+    def pair_similarity(self, student_skills, internship_skills):
+        """Cosine similarity of two free-text skills lists in the fitted space"""
+        a = self.transform(student_skills)
+        b = self.transform(internship_skills)
+        if a is None or b is None or not a.nnz or not b.nnz:
+            return 0.0
+        return float(min(a.multiply(b).sum(), 1.0))
@@ -0,0 +1,25 @@
+"""Index matches by student and score for per-student retention
+
+Revision ID: 2a8c6d4e9b13
+Revises: 9e4f3a7b1c02
+Create Date: 2026-10-17 12:31:55.207184
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2a8c6d4e9b13'
+down_revision = '9e4f3a7b1c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.create_index('ix_matches_student_score', ['student_id', 'overall_score'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.drop_index('ix_matches_student_score')
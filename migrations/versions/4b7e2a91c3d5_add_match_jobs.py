@@ -0,0 +1,47 @@
+"""Add match_jobs table for background match generation
+
+Revision ID: 4b7e2a91c3d5
+Revises: dfd3c897d4fa
+Create Date: 2026-10-17 10:12:40.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4b7e2a91c3d5'
+down_revision = 'dfd3c897d4fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'match_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('total_students', sa.Integer(), nullable=True),
+        sa.Column('processed_students', sa.Integer(), nullable=True),
+        sa.Column('matches_written', sa.Integer(), nullable=True),
+        sa.Column('cursor', sa.Integer(), nullable=True),
+        sa.Column('chunk_size', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('claimed_by', sa.String(length=120), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['admins.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_match_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_match_jobs_status'))
+
+    op.drop_table('match_jobs')
@@ -0,0 +1,33 @@
+"""Stamp matches with the scoring engine version; keep per-run job stats
+
+Revision ID: 5d2e9f1a7c84
+Revises: 2a8c6d4e9b13
+Create Date: 2026-10-17 13:14:09.882731
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d2e9f1a7c84'
+down_revision = '2a8c6d4e9b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('engine_version', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_matches_engine_version'), ['engine_version'], unique=False)
+
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stats', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.drop_column('stats')
+
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_matches_engine_version'))
+        batch_op.drop_column('engine_version')
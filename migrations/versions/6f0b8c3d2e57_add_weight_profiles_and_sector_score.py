@@ -0,0 +1,48 @@
+"""Named, versioned weight profiles; store the sector component on matches
+
+Revision ID: 6f0b8c3d2e57
+Revises: 5d2e9f1a7c84
+Create Date: 2026-10-17 14:02:41.305518
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6f0b8c3d2e57'
+down_revision = '5d2e9f1a7c84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'weight_profiles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('weights', sa.JSON(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', 'version')
+    )
+    with op.batch_alter_table('weight_profiles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_weight_profiles_is_active'), ['is_active'], unique=False)
+
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sector_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('weight_profile_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_matches_weight_profile_id', 'weight_profiles', ['weight_profile_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('matches', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_matches_weight_profile_id', type_='foreignkey')
+        batch_op.drop_column('weight_profile_id')
+        batch_op.drop_column('sector_score')
+
+    with op.batch_alter_table('weight_profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_weight_profiles_is_active'))
+
+    op.drop_table('weight_profiles')
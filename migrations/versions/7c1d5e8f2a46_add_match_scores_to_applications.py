@@ -0,0 +1,37 @@
+"""Snapshot match scores on applications
+
+Revision ID: 7c1d5e8f2a46
+Revises: 4b7e2a91c3d5
+Create Date: 2026-10-17 11:03:27.540916
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7c1d5e8f2a46'
+down_revision = '4b7e2a91c3d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('match_percentage', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('skills_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('location_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('academic_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('sector_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('affirmative_action_score', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('scored_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_column('scored_at')
+        batch_op.drop_column('affirmative_action_score')
+        batch_op.drop_column('sector_score')
+        batch_op.drop_column('academic_score')
+        batch_op.drop_column('location_score')
+        batch_op.drop_column('skills_score')
+        batch_op.drop_column('match_percentage')
@@ -0,0 +1,37 @@
+"""Gazetteer place ids on students and internships
+
+Revision ID: 8a3f5c1e7d20
+Revises: 6f0b8c3d2e57
+Create Date: 2026-10-17 15:26:08.114902
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8a3f5c1e7d20'
+down_revision = '6f0b8c3d2e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preferred_location_ids', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('current_location_id', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('location_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('is_remote', sa.Boolean(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_internships_location_id'), ['location_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_internships_location_id'))
+        batch_op.drop_column('is_remote')
+        batch_op.drop_column('location_id')
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('current_location_id')
+        batch_op.drop_column('preferred_location_ids')
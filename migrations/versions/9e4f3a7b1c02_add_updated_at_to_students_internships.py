@@ -0,0 +1,31 @@
+"""Track updated_at on students and internships
+
+Revision ID: 9e4f3a7b1c02
+Revises: 7c1d5e8f2a46
+Create Date: 2026-10-17 11:48:02.613370
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9e4f3a7b1c02'
+down_revision = '7c1d5e8f2a46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
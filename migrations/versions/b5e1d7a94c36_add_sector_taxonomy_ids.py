@@ -0,0 +1,33 @@
+"""Sector taxonomy ids on students and internships
+
+Revision ID: b5e1d7a94c36
+Revises: 8a3f5c1e7d20
+Create Date: 2026-10-17 16:12:44.870331
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b5e1d7a94c36'
+down_revision = '8a3f5c1e7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sector_interest_ids', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sector_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_internships_sector_id'), ['sector_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('internships', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_internships_sector_id'))
+        batch_op.drop_column('sector_id')
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('sector_interest_ids')
@@ -0,0 +1,84 @@
+"""Canonical skills and student/internship skill association tables
+
+Revision ID: c3a9e2f6b817
+Revises: b5e1d7a94c36
+Create Date: 2026-10-17 17:04:18.215093
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3a9e2f6b817'
+down_revision = 'b5e1d7a94c36'
+branch_labels = None
+depends_on = None
+
+
+def _parse_skills(*texts):
+    # frozen copy of app.skills_model.parse_skills as of this revision
+    names = []
+    for text in texts:
+        for part in re.split(r"[,;\n]", text or ""):
+            name = " ".join(part.lower().split())
+            if name and len(name) <= 100 and name not in names:
+                names.append(name)
+    return names
+
+
+def upgrade():
+    skills = op.create_table(
+        'skills',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    student_skills = op.create_table(
+        'student_skills',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id']),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id']),
+        sa.PrimaryKeyConstraint('student_id', 'skill_id'),
+    )
+    op.create_index(op.f('ix_student_skills_skill_id'), 'student_skills', ['skill_id'], unique=False)
+    internship_skills = op.create_table(
+        'internship_skills',
+        sa.Column('internship_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['internship_id'], ['internships.id']),
+        sa.ForeignKeyConstraint(['skill_id'], ['skills.id']),
+        sa.PrimaryKeyConstraint('internship_id', 'skill_id'),
+    )
+    op.create_index(op.f('ix_internship_skills_skill_id'), 'internship_skills', ['skill_id'], unique=False)
+
+    # backfill from the free-text columns
+    bind = op.get_bind()
+    parsed = {
+        'student': {row.id: _parse_skills(row.technical_skills, row.soft_skills) for row in bind.execute(
+            sa.text('SELECT id, technical_skills, soft_skills FROM students'))},
+        'internship': {row.id: _parse_skills(row.required_skills) for row in bind.execute(
+            sa.text('SELECT id, required_skills FROM internships'))},
+    }
+    names = sorted({name for rows in parsed.values() for names in rows.values() for name in names})
+    if not names:
+        return
+    # let the database assign ids so its sequence stays in step
+    op.bulk_insert(skills, [{'name': name} for name in names])
+    id_of = {row.name: row.id for row in bind.execute(sa.text('SELECT id, name FROM skills'))}
+    op.bulk_insert(student_skills, [
+        {'student_id': sid, 'skill_id': id_of[name]} for sid, found in parsed['student'].items() for name in found
+    ])
+    op.bulk_insert(internship_skills, [
+        {'internship_id': iid, 'skill_id': id_of[name]} for iid, found in parsed['internship'].items() for name in found
+    ])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_internship_skills_skill_id'), table_name='internship_skills')
+    op.drop_table('internship_skills')
+    op.drop_index(op.f('ix_student_skills_skill_id'), table_name='student_skills')
+    op.drop_table('student_skills')
+    op.drop_table('skills')
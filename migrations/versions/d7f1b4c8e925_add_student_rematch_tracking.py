@@ -0,0 +1,34 @@
+"""Stored profile completeness and rematch tracking on students
+
+Revision ID: d7f1b4c8e925
+Revises: c3a9e2f6b817
+Create Date: 2026-10-17 17:48:36.604127
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd7f1b4c8e925'
+down_revision = 'c3a9e2f6b817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing students start flagged, so the first batch run after this matches everyone once;
+    # profile_completeness is filled in by `flask backfill-completeness`
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile_completeness', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('profile_version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('needs_rematch', sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.create_index('ix_students_rematch_completeness', ['needs_rematch', 'profile_completeness'],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_index('ix_students_rematch_completeness')
+        batch_op.drop_column('needs_rematch')
+        batch_op.drop_column('profile_version')
+        batch_op.drop_column('profile_completeness')
@@ -0,0 +1,25 @@
+"""Full-run option on match jobs
+
+Revision ID: e2c6a9d3f481
+Revises: d7f1b4c8e925
+Create Date: 2026-10-17 19:22:05.318462
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e2c6a9d3f481'
+down_revision = 'd7f1b4c8e925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changed_only', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade():
+    with op.batch_alter_table('match_jobs', schema=None) as batch_op:
+        batch_op.drop_column('changed_only')
@@ -0,0 +1,54 @@
+"""Relink stored skills to their canonical names from the skill vocabulary
+
+Revision ID: f4b8d2a6c139
+Revises: e2c6a9d3f481
+Create Date: 2026-10-17 19:41:52.907316
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.skill_vocabulary import canonical_skill
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a6c139'
+down_revision = 'e2c6a9d3f481'
+branch_labels = None
+depends_on = None
+
+# the association tables and their owner column
+LINK_TABLES = (('student_skills', 'student_id'), ('internship_skills', 'internship_id'))
+
+
+def upgrade():
+    # rows backfilled by c3a9e2f6b817 hold the raw parsed names ("ml"); later
+    # vocabulary changes are picked up by `flask normalize-ids` instead
+    bind = op.get_bind()
+    skills = sa.table('skills', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    id_of = {row.name: row.id for row in bind.execute(sa.select(skills.c.id, skills.c.name))}
+    renamed = {name: canonical_skill(name) for name in id_of}
+    renamed = {name: canonical for name, canonical in renamed.items() if canonical != name}
+    if not renamed:
+        return
+
+    missing = sorted(set(renamed.values()) - set(id_of))
+    if missing:
+        op.bulk_insert(skills, [{'name': name} for name in missing])
+        id_of.update((row.name, row.id) for row in bind.execute(
+            sa.select(skills.c.id, skills.c.name).where(skills.c.name.in_(missing))))
+    remap = {id_of[name]: id_of[canonical] for name, canonical in renamed.items()}
+
+    for table_name, owner in LINK_TABLES:
+        links = sa.table(table_name, sa.column(owner, sa.Integer), sa.column('skill_id', sa.Integer))
+        pairs = {tuple(row) for row in bind.execute(sa.select(links.c[owner], links.c.skill_id))}
+        moved = {(o, remap[s]) for o, s in pairs if s in remap} - pairs
+        if moved:
+            op.bulk_insert(links, [{owner: o, 'skill_id': s} for o, s in sorted(moved)])
+        bind.execute(links.delete().where(links.c.skill_id.in_(list(remap))))
+
+    bind.execute(skills.delete().where(skills.c.id.in_(list(remap))))
+
+
+def downgrade():
+    # the raw names are gone; relinking is harmless to keep
+    pass